@@ -44,8 +44,12 @@ class FileSelectionDialog(QDialog):
         self.setLayout(layout)
     
     def select_record_file(self):
-        file, _ = QFileDialog.getOpenFileName(
-            self, "Select Record File", "", "CSV Files (*.csv);;All Files (*)"
+        # A save dialog, so a new record file can be named as well as an
+        # existing one picked; records are appended, never overwritten
+        file, _ = QFileDialog.getSaveFileName(
+            self, "Select Record File", "",
+            "Record Files (*.csv *.db *.sqlite *.sqlite3);;CSV Files (*.csv);;SQLite Files (*.db *.sqlite *.sqlite3);;All Files (*)",
+            options=QFileDialog.DontConfirmOverwrite
         )
         if file:
             self.record_file = file
@@ -1,10 +1,20 @@
 # gui/main_window.py
-from PyQt5.QtWidgets import (QMainWindow, QPushButton, QTextEdit, QVBoxLayout, 
+from datetime import datetime
+from PyQt5.QtWidgets import (QMainWindow, QPushButton, QListView, QVBoxLayout, 
                            QWidget, QHBoxLayout, QLabel, QLineEdit, QListWidget,
-                           QFileDialog, QMessageBox, QDialog)
+                           QFileDialog, QMessageBox, QDialog, QProgressDialog)
+from PyQt5.QtCore import QCoreApplication, QEvent
 from utils.file_handler import FileHandler
+from utils.record_store import open_record_store
+from utils.record_importer import RecordImportThread
 from utils.voice_recorder import VoiceRecorderThread
+from utils.keyword_matcher import create_keyword_matcher
+from utils.keyword_stats import open_keyword_stats
+from utils.recognizers import create_backend
+from utils.settings import load_settings
+from utils.metrics import start_exporter
 from gui.file_dialog import FileSelectionDialog
+from gui.models import RecordListModel, LogListModel, UpdateBatcher
 
 class VoiceToTextApp(QMainWindow):
     def __init__(self, record_file, keywords_file):
@@ -12,19 +22,44 @@ class VoiceToTextApp(QMainWindow):
         self.record_file = record_file
         self.keywords_file = keywords_file
         self.file_handler = FileHandler(record_file, keywords_file)
+        self.settings = load_settings()
+        self.backend = None
+        self.metrics_exporter = start_exporter(self.settings)
         
         self.setWindowTitle("Voice to Text with Keyword Filter")
         self.setGeometry(100, 100, 800, 500)
         
         self.keywords = self.file_handler.load_keywords()
-        self.recorded_logs = self.file_handler.load_recorded()
+        self.keyword_matcher = self.create_keyword_matcher()
+        self.record_store = open_record_store(record_file, self.settings)
+        self.keyword_stats = open_keyword_stats(record_file, self.record_store)
+        
+        # Log and record updates are queued and shown in timed batches
+        display_settings = self.settings["display"]
+        self.log_model = LogListModel(display_settings["log_scrollback"], self)
+        self.record_model = RecordListModel(self.record_store, display_settings["page_size"], parent=self)
+        self.log_batcher = UpdateBatcher(self.show_log_lines, display_settings["batch_interval_ms"], self)
+        self.record_batcher = UpdateBatcher(self.save_records, display_settings["batch_interval_ms"], self)
         
         self.initUI()
         self.recorder_thread = None
-        
-        # Display existing records in the recorded area
-        for record in self.recorded_logs:
-            self.recorded_area.append(f"[{record['timestamp']}] {record['text']}")
+        self.import_thread = None
+        self.import_progress = None
+        self.recorded_area.scrollToBottom()
+
+    def create_list_view(self, model):
+        view = QListView()
+        view.setModel(model)
+        view.setUniformItemSizes(True)
+        view.setEditTriggers(QListView.NoEditTriggers)
+        return view
+
+    def is_scrolled_to_bottom(self, view):
+        scrollbar = view.verticalScrollBar()
+        return scrollbar.value() == scrollbar.maximum()
+
+    def create_keyword_matcher(self):
+        return create_keyword_matcher(self.keywords, self.settings)
 
     def initUI(self):
         main_widget = QWidget()
@@ -41,22 +76,33 @@ class VoiceToTextApp(QMainWindow):
         
         log_panel = QVBoxLayout()
         log_panel.addWidget(QLabel("Log"))
-        self.log_area = QTextEdit()
-        self.log_area.setReadOnly(True)
+        self.log_area = self.create_list_view(self.log_model)
         log_panel.addWidget(self.log_area)
+        # Interim text of the phrase being spoken, replaced by the final text
+        self.partial_label = QLabel()
+        self.partial_label.setWordWrap(True)
+        log_panel.addWidget(self.partial_label)
         panel_layout.addLayout(log_panel)
 
         recorded_panel = QVBoxLayout()
         recorded_panel.addWidget(QLabel("Record"))
-        self.recorded_area = QTextEdit()
-        self.recorded_area.setReadOnly(True)
+        self.recorded_area = self.create_list_view(self.record_model)
         recorded_panel.addWidget(self.recorded_area)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search records")
+        self.search_input.returnPressed.connect(self.search_records)
+        recorded_panel.addWidget(self.search_input)
+        self.search_results = QListWidget()
+        self.search_results.hide()
+        recorded_panel.addWidget(self.search_results)
         panel_layout.addLayout(recorded_panel)
 
         keyword_layout = QVBoxLayout()
         keyword_layout.addWidget(QLabel("Library Keywords"))
         self.keyword_list = QListWidget()
         self.keyword_list.addItems(self.keywords)
+        self.keyword_list.currentItemChanged.connect(self.show_keyword_hits)
         keyword_layout.addWidget(self.keyword_list)
 
         self.keyword_input = QLineEdit()
@@ -73,9 +119,9 @@ class VoiceToTextApp(QMainWindow):
         # Import and Export buttons
         import_export_layout = QHBoxLayout()
         
-        import_btn = QPushButton("Import Record")
-        import_btn.clicked.connect(self.import_recorded)
-        import_export_layout.addWidget(import_btn)
+        self.import_button = QPushButton("Import Record")
+        self.import_button.clicked.connect(self.import_recorded)
+        import_export_layout.addWidget(self.import_button)
 
         export_btn = QPushButton("Export Record")
         export_btn.clicked.connect(self.export_recorded)
@@ -84,6 +130,16 @@ class VoiceToTextApp(QMainWindow):
         keyword_layout.addLayout(import_export_layout)
 
         panel_layout.addLayout(keyword_layout)
+
+        hits_panel = QVBoxLayout()
+        hits_panel.addWidget(QLabel("Keyword Hits"))
+        self.hits_summary = QLabel()
+        hits_panel.addWidget(self.hits_summary)
+        self.hits_list = QListWidget()
+        hits_panel.addWidget(self.hits_list)
+        panel_layout.addLayout(hits_panel)
+        self.show_keyword_hits()
+
         main_layout.addLayout(panel_layout)
 
         control_layout = QHBoxLayout()
@@ -97,6 +153,10 @@ class VoiceToTextApp(QMainWindow):
         self.stop_button.setEnabled(False)
         control_layout.addWidget(self.stop_button)
         
+        self.stats_label = QLabel()
+        self.update_stats({'queue_depth': 0, 'dropped': 0, 'backpressure': 0})
+        control_layout.addWidget(self.stats_label)
+        
         # Add Return to File Selection button
         return_btn = QPushButton("Change Files")
         return_btn.clicked.connect(self.return_to_file_selection)
@@ -106,34 +166,44 @@ class VoiceToTextApp(QMainWindow):
         main_widget.setLayout(main_layout)
 
     def return_to_file_selection(self):
-        # Stop recording if active
+        # Stop recording and importing if active
         if self.recorder_thread:
             self.stop_recording()
+        self.stop_import()
         
         # Save current data
-        self.file_handler.save_recorded(self.recorded_logs)
+        self.record_batcher.flush()
+        self.record_store.close()
+        self.keyword_stats.save()
         self.file_handler.save_keywords(self.keywords)
         
         # Show file selection dialog
         file_dialog = FileSelectionDialog()
-        if file_dialog.exec_() == QDialog.Accepted:
+        if file_dialog.exec_() != QDialog.Accepted:
+            self.record_store = open_record_store(self.record_file, self.settings)
+            self.keyword_stats = open_keyword_stats(self.record_file, self.record_store)
+            self.record_model.set_store(self.record_store)
+            self.show_keyword_hits()
+        else:
             # Update file paths
             self.record_file = file_dialog.record_file
             self.keywords_file = file_dialog.keywords_file
             self.file_handler = FileHandler(self.record_file, self.keywords_file)
             
             # Clear and reload data
-            self.recorded_area.clear()
             self.keyword_list.clear()
             
             # Load new data
             self.keywords = self.file_handler.load_keywords()
-            self.recorded_logs = self.file_handler.load_recorded()
+            self.keyword_matcher = self.create_keyword_matcher()
+            self.record_store = open_record_store(self.record_file, self.settings)
+            self.keyword_stats = open_keyword_stats(self.record_file, self.record_store)
             
             # Update UI
             self.keyword_list.addItems(self.keywords)
-            for record in self.recorded_logs:
-                self.recorded_area.append(f"[{record['timestamp']}] {record['text']}")
+            self.record_model.set_store(self.record_store)
+            self.show_keyword_hits()
+            self.recorded_area.scrollToBottom()
             
             # Update file paths in UI
             self.centralWidget().layout().itemAt(0).layout().itemAt(0).widget().setText(f"Record File: {self.record_file}")
@@ -143,35 +213,127 @@ class VoiceToTextApp(QMainWindow):
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         
-        self.recorder_thread = VoiceRecorderThread(self.keywords)
+        # The backend is created once and reused, so offline models are only
+        # loaded on the first recording
+        if self.backend is None:
+            try:
+                self.backend = create_backend(self.settings["recognizer"])
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error creating recognizer: {str(e)}")
+                self.start_button.setEnabled(True)
+                self.stop_button.setEnabled(False)
+                return
+        
+        try:
+            self.recorder_thread = VoiceRecorderThread(
+                self.keyword_matcher, backend=self.backend, settings=self.settings
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error opening audio source: {str(e)}")
+            self.start_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
+            return
         self.recorder_thread.textUpdated.connect(self.update_log)
+        self.recorder_thread.partialUpdated.connect(self.update_partial)
         self.recorder_thread.recordedUpdated.connect(self.update_recorded)
+        self.recorder_thread.statsUpdated.connect(self.update_stats)
         self.recorder_thread.start()
 
     def stop_recording(self):
         if self.recorder_thread:
             self.recorder_thread.stop()
             self.recorder_thread.wait()
+            # Results emitted during the shutdown are still queued for this
+            # thread; deliver them before the record store may be closed
+            QCoreApplication.sendPostedEvents(None, QEvent.MetaCall)
+            # The final stats carry the shutdown time
+            self.update_stats(self.recorder_thread.stats_snapshot())
             self.recorder_thread = None
             
+        self.partial_label.clear()
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
 
-    def update_log(self, timestamp, text):
-        formatted_text = f"[{timestamp}] {text}"
-        self.log_area.append(formatted_text)
+    def update_stats(self, stats):
+        text = (f"Queue: {stats['queue_depth']} | Dropped: {stats['dropped']} | "
+                f"Backpressure: {stats['backpressure']}")
+        if stats.get('first_text') is not None:
+            text += f" | First text: {stats['first_text'] * 1000:.0f} ms"
+        if stats.get('shutdown') is not None:
+            text += f" | Stopped in: {stats['shutdown'] * 1000:.0f} ms"
+        self.stats_label.setText(text)
+
+    def update_log(self, timestamp, text, source=""):
+        formatted_text = f"[{timestamp}] {source}: {text}" if source else f"[{timestamp}] {text}"
+        self.log_batcher.add(formatted_text)
+        self.partial_label.clear()
+
+    def update_partial(self, timestamp, text, source=""):
+        prefix = f"[{timestamp}] {source}: " if source else f"[{timestamp}] "
+        self.partial_label.setText(f"{prefix}{text} ...")
+
+    def show_log_lines(self, lines):
+        follow = self.is_scrolled_to_bottom(self.log_area)
+        self.log_model.append_lines(lines)
+        if follow:
+            self.log_area.scrollToBottom()
 
-    def update_recorded(self, timestamp, text):
-        self.recorded_logs.append({'timestamp': timestamp, 'text': text})
-        formatted_text = f"[{timestamp}] {text}"
-        self.recorded_area.append(formatted_text)
-        # Auto-save to file when new record is added
-        self.file_handler.save_recorded(self.recorded_logs)
+    def update_recorded(self, timestamp, text, keywords, source, captured_at):
+        # Dated with the capture time of the phrase, so the store and the
+        # keyword statistics agree on when the record was made
+        self.record_batcher.add({'timestamp': timestamp, 'text': text, 'keywords': keywords, 'source': source,
+                                 'recorded_at': captured_at})
+
+    def save_records(self, records):
+        follow = self.is_scrolled_to_bottom(self.recorded_area)
+        self.record_store.extend(records)
+        self.keyword_stats.add_records(records)
+        self.record_model.records_appended(len(records))
+        if follow:
+            self.recorded_area.scrollToBottom()
+        self.show_keyword_hits()
+
+    def show_keyword_hits(self, *args):
+        # Hits of the selected keyword today, per hour, from the running
+        # counts; never touches the records themselves
+        self.hits_list.clear()
+        item = self.keyword_list.currentItem()
+        if item is None:
+            self.hits_summary.setText("Select a keyword")
+            return
+        keyword = item.text()
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        self.hits_summary.setText(
+            f"{keyword}\nTotal: {self.keyword_stats.total(keyword)} | "
+            f"Today: {self.keyword_stats.day_count(keyword, today)} | "
+            f"This hour: {self.keyword_stats.hour_count(keyword, today, now.hour)}"
+        )
+        self.hits_list.addItems([
+            f"{hour:02d}:00  {count}" for hour, count in enumerate(self.keyword_stats.hourly(keyword, today))
+        ])
+
+    def search_records(self):
+        # The first page of records matching the query, as the store searches
+        # them; an empty query hides the results
+        self.search_results.clear()
+        query = self.search_input.text().strip()
+        if not query:
+            self.search_results.hide()
+            return
+        records = self.record_store.search(query=query, limit=self.record_model.page_size)
+        self.search_results.addItems([
+            f"[{record['timestamp']}] {record['source']}: {record['text']}"
+            if record.get('source') else f"[{record['timestamp']}] {record['text']}"
+            for record in records
+        ] or ["No matching records"])
+        self.search_results.show()
 
     def add_keyword(self):
         keyword = self.keyword_input.text().strip()
         if keyword and keyword not in self.keywords:
             self.keywords.append(keyword)
+            self.keyword_matcher.add(keyword)
             self.keyword_list.addItem(keyword)
             self.file_handler.save_keywords(self.keywords)
         self.keyword_input.clear()
@@ -180,29 +342,89 @@ class VoiceToTextApp(QMainWindow):
         selected_item = self.keyword_list.currentItem()
         if selected_item:
             self.keywords.remove(selected_item.text())
+            self.keyword_matcher.remove(selected_item.text())
             self.keyword_list.takeItem(self.keyword_list.row(selected_item))
             self.file_handler.save_keywords(self.keywords)
 
     def import_recorded(self):
-        try:
-            filepath, _ = QFileDialog.getOpenFileName(
-                self, "Import Records", "", "CSV Files (*.csv);;All Files (*)"
-            )
-            if filepath:
-                with open(filepath, 'r') as file:
-                    import_handler = FileHandler(filepath, self.keywords_file)
-                    imported_records = import_handler.load_recorded()
-                    
-                    if imported_records:
-                        self.recorded_area.clear()
-                        self.recorded_logs.extend(imported_records)
-                        for record in self.recorded_logs:
-                            formatted_text = f"[{record['timestamp']}] {record['text']}"
-                            self.recorded_area.append(formatted_text)
-                        self.file_handler.save_recorded(self.recorded_logs)
-                        QMessageBox.information(self, "Success", "Records imported successfully!")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        # The file is imported on a worker thread, so recording and the
+        # record view keep working during large imports
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "Import Records", "", "CSV Files (*.csv);;All Files (*)"
+        )
+        if not filepath or self.import_thread:
+            return
+        self.record_batcher.flush()
+        self.import_button.setEnabled(False)
+
+        self.import_progress = QProgressDialog("Importing records...", "Cancel", 0, 100, self)
+        self.import_progress.setWindowTitle("Import Records")
+        self.import_progress.setMinimumDuration(500)
+        self.import_progress.setAutoClose(False)
+        self.import_progress.setAutoReset(False)
+        self.import_progress.canceled.connect(self.cancel_import)
+
+        # Imported records count towards the keyword hits as they arrive
+        self.import_thread = RecordImportThread(
+            self.record_store, filepath, on_records=self.keyword_stats.add_records
+        )
+        self.import_thread.progress_updated.connect(self.update_import_progress)
+        self.import_thread.result_ready.connect(self.import_finished)
+        self.import_thread.failed.connect(self.import_failed)
+        self.import_thread.start()
+
+    def update_import_progress(self, percent, imported):
+        if self.import_progress:
+            self.import_progress.setValue(percent)
+            self.import_progress.setLabelText(f"Importing records... {imported} imported")
+
+    def cancel_import(self):
+        if self.import_thread:
+            self.import_thread.stop()
+
+    def stop_import(self):
+        # Waits for the worker; its pending signals are then ignored
+        thread = self.import_thread
+        if thread is None:
+            return
+        self.import_thread = None
+        thread.stop()
+        thread.wait()
+        self.close_import_progress()
+        self.record_model.refresh()
+
+    def close_import_progress(self):
+        if self.import_progress:
+            self.import_progress.close()
+            self.import_progress = None
+        self.import_button.setEnabled(True)
+
+    def import_finished(self, result):
+        if self.import_thread is None:
+            return
+        self.import_thread.wait()
+        self.import_thread = None
+        self.close_import_progress()
+        self.record_model.refresh()
+        self.show_keyword_hits()
+
+        message = (f"{result['imported']} records imported, "
+                   f"{result['duplicates']} duplicates skipped.")
+        if result['cancelled']:
+            QMessageBox.information(self, "Import Cancelled",
+                                    f"{message} Import the file again to continue.")
+        else:
+            QMessageBox.information(self, "Success", f"Records imported successfully! {message}")
+
+    def import_failed(self, error):
+        if self.import_thread is None:
+            return
+        self.import_thread.wait()
+        self.import_thread = None
+        self.close_import_progress()
+        self.record_model.refresh()
+        self.show_keyword_hits()
+        QMessageBox.critical(self, "Error", error)
 
     def export_recorded(self):
         try:
@@ -210,14 +432,19 @@ class VoiceToTextApp(QMainWindow):
                 self, "Export Records", "", "CSV Files (*.csv);;All Files (*)"
             )
             if filepath:
-                export_handler = FileHandler(filepath, self.keywords_file)
-                export_handler.save_recorded(self.recorded_logs)
+                self.record_batcher.flush()
+                self.record_store.export_csv(filepath)
                 QMessageBox.information(self, "Success", "Records exported successfully!")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error exporting records: {str(e)}")
 
     def closeEvent(self, event):
         self.stop_recording()
-        self.file_handler.save_recorded(self.recorded_logs)
+        self.stop_import()
+        self.record_batcher.flush()
+        self.record_store.close()
+        self.keyword_stats.save()
         self.file_handler.save_keywords(self.keywords)
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
         event.accept()
\ No newline at end of file
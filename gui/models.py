@@ -0,0 +1,115 @@
+# gui/models.py
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QTimer
+
+class RecordListModel(QAbstractListModel):
+    # Exposes every record in the store but only fetches the pages the view
+    # actually asks for, keeping a small LRU cache of pages
+    def __init__(self, store, page_size=500, cached_pages=8, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.pages = OrderedDict()
+        self.total = store.count()
+
+    def set_store(self, store):
+        self.beginResetModel()
+        self.store = store
+        self.pages.clear()
+        self.total = store.count()
+        self.endResetModel()
+
+    def refresh(self):
+        self.set_store(self.store)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total
+
+    def record(self, row):
+        page_number = row // self.page_size
+        page = self.pages.get(page_number)
+        if page is None:
+            page = self.store.page(page_number * self.page_size, self.page_size)
+            self.pages[page_number] = page
+            if len(self.pages) > self.cached_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_number)
+        offset = row - page_number * self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        record = self.record(index.row())
+        if record is None:
+            return None
+        if record.get('source'):
+            return f"[{record['timestamp']}] {record['source']}: {record['text']}"
+        return f"[{record['timestamp']}] {record['text']}"
+
+    def records_appended(self, count):
+        # The store already holds the new rows. They normally land on the
+        # last page, but a store ordered by time may place them before
+        # imported records dated later, so every cached page is dropped
+        if not count:
+            return
+        self.pages.clear()
+        self.beginInsertRows(QModelIndex(), self.total, self.total + count - 1)
+        self.total += count
+        self.endInsertRows()
+
+
+class LogListModel(QAbstractListModel):
+    # In-memory log lines capped at a scrollback limit; the oldest lines are
+    # dropped first
+    def __init__(self, scrollback=5000, parent=None):
+        super().__init__(parent)
+        self.scrollback = scrollback
+        self.lines = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        return self.lines[index.row()]
+
+    def append_lines(self, lines):
+        if not lines:
+            return
+        lines = lines[-self.scrollback:]
+        excess = len(self.lines) + len(lines) - self.scrollback
+        if excess > 0:
+            self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+            del self.lines[:excess]
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), len(self.lines), len(self.lines) + len(lines) - 1)
+        self.lines.extend(lines)
+        self.endInsertRows()
+
+
+class UpdateBatcher(QObject):
+    # Collects items from frequent signals and hands them to callback in one
+    # list at most every interval_ms
+    def __init__(self, callback, interval_ms=100, parent=None):
+        super().__init__(parent)
+        self.callback = callback
+        self.items = []
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def add(self, item):
+        self.items.append(item)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        items, self.items = self.items, []
+        if items:
+            self.callback(items)
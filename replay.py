@@ -0,0 +1,6 @@
+# replay.py
+import sys
+from utils.live_replay import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# tests/test_file_handler.py
+import os
+import tempfile
+import unittest
+from utils.file_handler import RecordJournal
+
+COMPLETE_ROW = b'12:00:01,halo semua,halo,mic,1792281601.250'
+
+class RecordJournalRecoverTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'record.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def recover(self, content):
+        with open(self.path, 'wb') as file:
+            file.write(content)
+        RecordJournal(self.path).close()
+        with open(self.path, 'rb') as file:
+            return file.read()
+
+    def test_complete_row_is_kept(self):
+        header = b'Timestamp,Text,Keywords,Source,Recorded At\r\n'
+        self.assertEqual(self.recover(header + COMPLETE_ROW), header + COMPLETE_ROW + b'\r\n')
+
+    def test_torn_recorded_at_is_dropped(self):
+        header = b'Timestamp,Text,Keywords,Source,Recorded At\r\n'
+        self.assertEqual(self.recover(header + COMPLETE_ROW[:-10]), header)
+
+    def test_torn_row_after_legacy_header_is_dropped(self):
+        # Two fields were enough to pass as a whole row of the old header
+        header = b'Timestamp,Text\r\n12:00:00,selamat pagi\r\n'
+        self.assertEqual(self.recover(header + b'12:00:01,halo se'), header)
+        self.assertEqual(self.recover(header + COMPLETE_ROW), header + COMPLETE_ROW + b'\r\n')
+
+    def test_torn_header_is_rewritten(self):
+        self.assertEqual(self.recover(b'Timestamp,Te'),
+                         b'Timestamp,Text,Keywords,Source,Recorded At\r\n')
+
+if __name__ == '__main__':
+    unittest.main()
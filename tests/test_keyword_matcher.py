@@ -0,0 +1,57 @@
+# tests/test_keyword_matcher.py
+import random
+import unittest
+from utils.keyword_matcher import FuzzyKeywordMatcher, WORD_PATTERN, bounded_distance
+
+def brute_force(matcher, text):
+    # Every word window checked against every keyword, as the trigram index
+    # must find them
+    words = [(match.start(), match.end(), matcher.normalize_word(match.group()))
+             for match in WORD_PATTERN.finditer(text)]
+    matches = set()
+    for keyword, (normalized, _) in matcher.entries.items():
+        count = normalized.count(" ") + 1
+        for i in range(len(words) - count + 1):
+            window = " ".join(word for _, _, word in words[i:i + count])
+            if len(window) < matcher.min_length:
+                continue
+            longest = max(len(window), len(normalized))
+            limit = matcher.allowed_distance(longest)
+            if bounded_distance(window, normalized, limit) <= limit:
+                matches.add((keyword, words[i][0], words[i + count - 1][1]))
+    return matches
+
+class FuzzyKeywordMatcherTest(unittest.TestCase):
+    def assert_matches_brute_force(self, keywords, texts, **options):
+        matcher = FuzzyKeywordMatcher(keywords, time_budget_ms=None, **options)
+        for text in texts:
+            found = {match[:3] for match in matcher.fuzzy_find(text)}
+            self.assertEqual(found, brute_force(matcher, text), text)
+
+    def test_repeated_trigrams(self):
+        self.assert_matches_brute_force(
+            ["annnn", "nnnnnn", "banana", "anana nana"], ["nnnn", "annn nnnnnnn", "bananana nanana"],
+            threshold=0.7, phonetic=False
+        )
+
+    def test_random_against_brute_force(self):
+        # A small alphabet gives many repeated trigrams and near-hits
+        rng = random.Random(0)
+        word = lambda: "".join(rng.choice("anb") for _ in range(rng.randint(2, 9)))
+        keywords = {word() for _ in range(200)}
+        keywords |= {f"{word()} {word()}" for _ in range(50)}
+        texts = [" ".join(word() for _ in range(8)) for _ in range(30)]
+        for threshold in (0.6, 0.7, 0.8):
+            self.assert_matches_brute_force(sorted(keywords), texts, threshold=threshold, phonetic=False)
+
+    def test_phonetic_spelling(self):
+        matcher = FuzzyKeywordMatcher(["Jakarta", "korupsi"], time_budget_ms=None)
+        self.assertEqual(matcher.matched_keywords("djakarta dan koropsi"), ["Jakarta", "korupsi"])
+
+    def test_remove(self):
+        matcher = FuzzyKeywordMatcher(["korupsi"], time_budget_ms=None)
+        matcher.remove("korupsi")
+        self.assertEqual(matcher.matched_keywords("koropsi"), [])
+
+if __name__ == '__main__':
+    unittest.main()
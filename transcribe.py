@@ -0,0 +1,6 @@
+# transcribe.py
+import sys
+from utils.batch_transcriber import main
+
+if __name__ == '__main__':
+    sys.exit(main())
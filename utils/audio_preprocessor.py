@@ -0,0 +1,103 @@
+# utils/audio_preprocessor.py
+import numpy as np
+import noisereduce as nr
+import soundfile as sf
+import librosa
+from utils.metrics import REGISTRY
+
+TARGET_SAMPLE_RATE = 16000
+
+class AudioPreprocessor:
+    def __init__(self, block_seconds=30.0, overlap_seconds=0.5, noise_seconds=5.0,
+                 target_sample_rate=TARGET_SAMPLE_RATE, metrics=None):
+        self.block_seconds = block_seconds
+        self.overlap_seconds = overlap_seconds
+        self.noise_seconds = noise_seconds
+        self.target_sample_rate = target_sample_rate
+        self.metrics = metrics or REGISTRY.component("preprocessor")
+
+    def cache_id(self):
+        # Identifies the settings that change the preprocessed output. The
+        # leading tag marks the resample-before-denoise order
+        return (f"mono16k:{self.block_seconds}:{self.overlap_seconds}:"
+                f"{self.noise_seconds}:{self.target_sample_rate}")
+
+    def duration(self, audio_path):
+        return sf.info(audio_path).duration
+
+    def read_mono(self, audio_file, start, stop):
+        audio_file.seek(start)
+        data = audio_file.read(stop - start, dtype='float32', always_2d=True)
+        return data.mean(axis=1)
+
+    def resample(self, y, sample_rate):
+        if sample_rate == self.target_sample_rate:
+            return y
+        return librosa.resample(y, orig_sr=sample_rate, target_sr=self.target_sample_rate)
+
+    def scan(self, audio_file, block_frames):
+        # A cheap first pass that keeps only the source peak and a noise
+        # sample made of short excerpts spread across the whole recording,
+        # so the noise profile matches the original whole-signal estimate
+        sample_rate = audio_file.samplerate
+        block_count = max(1, -(-audio_file.frames // block_frames))
+        excerpt_frames = max(int(self.noise_seconds * sample_rate) // block_count,
+                             int(0.25 * sample_rate))
+
+        peak = 0.0
+        excerpts = []
+        audio_file.seek(0)
+        for block in audio_file.blocks(blocksize=block_frames, dtype='float32', always_2d=True):
+            mono = block.mean(axis=1)
+            if len(mono):
+                peak = max(peak, float(np.abs(mono).max()))
+            excerpts.append(mono[:excerpt_frames].copy())
+
+        noise_clip = np.concatenate(excerpts) if excerpts else np.zeros(0, dtype=np.float32)
+        return noise_clip, peak
+
+    def denoise(self, y, sample_rate, noise_clip):
+        return nr.reduce_noise(
+            y=y,
+            sr=sample_rate,
+            y_noise=noise_clip,
+            prop_decrease=1.0,
+            stationary=True,
+            n_std_thresh_stationary=1.5
+        )
+
+    def stream(self, audio_path):
+        # Yields int16 mono blocks at the target sample rate. Each block is
+        # downmixed and resampled as soon as it is read, so denoising and
+        # normalization only ever see float32 mono at the target rate. Blocks
+        # are processed with overlap on both sides and then cropped, so block
+        # edges don't carry STFT or resampling artifacts
+        with sf.SoundFile(audio_path) as audio_file:
+            sample_rate = audio_file.samplerate
+            total_frames = audio_file.frames
+            block_frames = max(1, int(self.block_seconds * sample_rate))
+            overlap_frames = int(self.overlap_seconds * sample_rate)
+            ratio = self.target_sample_rate / sample_rate
+
+            with self.metrics.span('scan'):
+                noise_clip, peak = self.scan(audio_file, block_frames)
+                noise_clip = self.resample(noise_clip, sample_rate)
+            gain = 1.0 / peak if peak > 0 else 1.0
+
+            for start in range(0, total_frames, block_frames):
+                stop = min(total_frames, start + block_frames)
+                padded_start = max(0, start - overlap_frames)
+                padded_stop = min(total_frames, stop + overlap_frames)
+
+                with self.metrics.span('read'):
+                    y = self.read_mono(audio_file, padded_start, padded_stop)
+                with self.metrics.span('resample'):
+                    y = self.resample(y, sample_rate)
+                with self.metrics.span('denoise'):
+                    y = self.denoise(y, self.target_sample_rate, noise_clip) * gain
+
+                offset = round(start * ratio) - round(padded_start * ratio)
+                length = round(stop * ratio) - round(start * ratio)
+                block = y[offset:offset + length]
+
+                yield (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
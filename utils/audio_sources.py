@@ -0,0 +1,210 @@
+# utils/audio_sources.py
+import os
+import select
+import sys
+import threading
+import time
+import numpy as np
+import soundfile as sf
+import speech_recognition as sr
+
+SAMPLE_WIDTH = 2  # int16 PCM
+
+class SourceStream:
+    # The stream PhraseListener reads from. Reads return nothing once the
+    # source is stopped or runs out of audio, which ends listening
+    def __init__(self, source, read_frames, close=None):
+        self.source = source
+        self.read_frames = read_frames
+        self.close_stream = close
+
+    def read(self, size):
+        if self.source.stopped.is_set():
+            return b""
+        data = self.read_frames(size)
+        if not data:
+            self.source.exhausted = True
+            return b""
+        self.source.frames_read += len(data) // self.source.SAMPLE_WIDTH
+        return data
+
+    def close(self):
+        if self.close_stream:
+            self.close_stream()
+
+
+class LiveSource(sr.AudioSource):
+    # Base for the sources VoiceRecorderThread captures from. Every source
+    # has an id that tags its records, can be stopped from another thread
+    # and reports when it has no more audio
+    calibrate = False  # Measure ambient noise before the first phrase
+
+    def __init__(self, source_id, sample_rate, chunk_size=1024):
+        self.source_id = source_id
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = SAMPLE_WIDTH
+        self.CHUNK = chunk_size
+        self.stream = None
+        self.stopped = threading.Event()
+        self.exhausted = False
+        self.frames_read = 0
+
+    def captured_at(self, duration):
+        # Epoch seconds at which a phrase of this duration that was just
+        # read started
+        return time.time() - duration
+
+    def stop(self):
+        self.stopped.set()
+
+
+class MicrophoneSource(LiveSource):
+    calibrate = True
+
+    def __init__(self, source_id="", device_index=None, sample_rate=None, chunk_size=1024):
+        self.microphone = sr.Microphone(device_index, sample_rate, chunk_size)
+        super().__init__(source_id, self.microphone.SAMPLE_RATE, chunk_size)
+
+    def __enter__(self):
+        self.microphone.__enter__()
+        stream = self.microphone.stream
+        self.stream = SourceStream(self, stream.read)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+        return self.microphone.__exit__(exc_type, exc_value, traceback)
+
+
+class FileSource(LiveSource):
+    # Replays an audio file as mono int16 at its own sample rate. speed is a
+    # multiple of real time (0 reads as fast as possible) and loop restarts
+    # the file at its end. Phrases are timestamped on the replayed clock, as
+    # if the file had started playing when the source was opened
+    def __init__(self, path, source_id=None, speed=1.0, loop=False, chunk_size=1024):
+        super().__init__(
+            os.path.splitext(os.path.basename(path))[0] if source_id is None else source_id,
+            sf.info(path).samplerate,
+            chunk_size
+        )
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.file = None
+        self.opened_at = None
+        self.started = None
+
+    def __enter__(self):
+        self.file = sf.SoundFile(self.path)
+        self.opened_at = time.time()
+        self.started = time.monotonic()
+        self.stream = SourceStream(self, self.read_frames, self.file.close)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
+        self.stream = None
+        self.file = None
+
+    def read_frames(self, size):
+        data = self.file.read(size, dtype='int16', always_2d=True)
+        if not len(data) and self.loop and self.file.frames:
+            self.file.seek(0)
+            data = self.file.read(size, dtype='int16', always_2d=True)
+        if not len(data):
+            return b""
+
+        if self.speed:
+            # Sleep until this chunk is due at the requested speed
+            due = self.started + (self.frames_read + len(data)) / (self.SAMPLE_RATE * self.speed)
+            delay = due - time.monotonic()
+            if delay > 0:
+                self.stopped.wait(delay)
+
+        if data.shape[1] > 1:
+            data = data.mean(axis=1, dtype=np.float32).astype(np.int16)
+        return np.ascontiguousarray(data).tobytes()
+
+    def captured_at(self, duration):
+        return self.opened_at + self.frames_read / self.SAMPLE_RATE - duration
+
+
+class PipeSource(LiveSource):
+    # Raw little-endian int16 PCM from a named pipe, or from stdin for "-".
+    # The writer sets the pace; the source ends when the writer closes.
+    # A named pipe is opened without waiting for a writer, and reads wait
+    # for data in poll_interval steps, so a stop ends them even while no
+    # writer is connected or the writer is silent
+    poll_interval = 0.2
+
+    def __init__(self, path, source_id=None, sample_rate=16000, channels=1, chunk_size=1024):
+        super().__init__(
+            ("stdin" if path == "-" else os.path.basename(path)) if source_id is None else source_id,
+            sample_rate,
+            chunk_size
+        )
+        self.path = path
+        self.channels = channels
+        self.fd = None
+
+    def __enter__(self):
+        if self.path == "-":
+            self.fd = sys.stdin.fileno()
+            close = None
+        else:
+            self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+            close = lambda fd=self.fd: os.close(fd)
+        self.stream = SourceStream(self, self.read_frames, close)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
+        self.stream = None
+        self.fd = None
+
+    def read_frames(self, size):
+        frame_bytes = SAMPLE_WIDTH * self.channels
+        wanted = size * frame_bytes
+        chunks = []
+        received = 0
+        # Pipes return short reads; keep reading until a whole chunk arrived
+        while received < wanted and not self.stopped.is_set():
+            readable, _, _ = select.select([self.fd], [], [], self.poll_interval)
+            if not readable:
+                continue
+            try:
+                chunk = os.read(self.fd, wanted - received)
+            except BlockingIOError:
+                continue
+            if not chunk:
+                break
+            chunks.append(chunk)
+            received += len(chunk)
+        data = b"".join(chunks)
+        data = data[:len(data) - len(data) % frame_bytes]
+        if self.channels > 1 and data:
+            samples = np.frombuffer(data, dtype='<i2').reshape(-1, self.channels)
+            data = samples.mean(axis=1, dtype=np.float32).astype(np.int16).tobytes()
+        return data
+
+
+SOURCES = {
+    'microphone': MicrophoneSource,
+    'file': FileSource,
+    'pipe': PipeSource
+}
+
+def create_sources(configs):
+    # Each config names a source type plus its constructor arguments, e.g.
+    # {"type": "file", "path": "a.wav", "speed": 4}. No configs means the
+    # default microphone
+    if not configs:
+        return [MicrophoneSource()]
+    sources = []
+    for config in configs:
+        options = dict(config)
+        kind = options.pop("type", "microphone")
+        if kind not in SOURCES:
+            raise ValueError(f"Unknown audio source: {kind}")
+        sources.append(SOURCES[kind](**options))
+    return sources
@@ -0,0 +1,241 @@
+# utils/batch_transcriber.py
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.file_handler import FileHandler
+from utils.keyword_matcher import create_keyword_matcher
+from utils.metrics import MetricsRegistry, REGISTRY
+from utils.settings import load_settings
+from utils.transcription_pipeline import TranscriptionPipeline
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3', '.aiff', '.aif')
+OUTPUT_FORMATS = ('csv', 'jsonl')
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+def find_audio_files(inputs, manifest=None):
+    # Directories are searched recursively; a manifest lists one path per
+    # line, relative paths being relative to the manifest itself
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                paths.extend(
+                    os.path.join(root, name) for name in sorted(files)
+                    if name.lower().endswith(AUDIO_EXTENSIONS)
+                )
+        else:
+            paths.append(path)
+
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    paths.append(os.path.join(base, line))
+
+    # Listed twice (e.g. in a directory and the manifest) is transcribed once
+    unique = []
+    seen = set()
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+def output_paths(audio_files, output_dir):
+    # Files with the same name from different directories get a numbered
+    # suffix instead of overwriting each other
+    bases = {}
+    used = set()
+    for audio_file in audio_files:
+        if output_dir:
+            name = os.path.splitext(os.path.basename(audio_file))[0]
+            base = os.path.join(output_dir, name)
+        else:
+            base = os.path.splitext(audio_file)[0]
+        candidate = base
+        suffix = 1
+        while os.path.abspath(candidate) in used:
+            suffix += 1
+            candidate = f"{base}_{suffix}"
+        used.add(os.path.abspath(candidate))
+        bases[audio_file] = candidate
+    return bases
+
+def write_results(base, transcription, formats, keyword_matcher, metrics=None, source=''):
+    # The CSV uses the record file layout, so it can be opened or imported
+    # like any other record file
+    records = [
+        {
+            'timestamp': chunk['start_time'],
+            'text': chunk['text'],
+            'keywords': keyword_matcher.matched_keywords(chunk['text']),
+            'source': source
+        }
+        for chunk in transcription
+    ]
+    written = []
+    if 'csv' in formats:
+        FileHandler(f"{base}.csv", None, metrics).save_recorded(records)
+        written.append(f"{base}.csv")
+    if 'jsonl' in formats:
+        temp_file = f"{base}.jsonl.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            for chunk, record in zip(transcription, records):
+                entry = dict(chunk, keywords=record['keywords'], source=source)
+                file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(temp_file, f"{base}.jsonl")
+        written.append(f"{base}.jsonl")
+    return written
+
+def transcribe_file(audio_file, base, formats, settings, keywords, chunk_length_ms, verbose):
+    # Runs in a worker process, so it only takes and returns picklable values
+    # and never raises. Metrics go to a registry of their own that is sent
+    # back with the result
+    started = time.perf_counter()
+    failed_chunks = 0
+    registry = MetricsRegistry()
+
+    def on_chunk(chunk):
+        if verbose:
+            print(f"{audio_file} [{chunk['start_time']}] {chunk['text']}", flush=True)
+
+    try:
+        # The checkpoint goes next to the results, which are known to be
+        # writable, and is unique per output like the results themselves
+        pipeline = TranscriptionPipeline(
+            audio_file, chunk_length_ms, settings=settings, checkpoint_file=f"{base}.progress.jsonl",
+            on_chunk=on_chunk, registry=registry
+        )
+        duration = pipeline.preprocessor.duration(audio_file)
+        transcription = pipeline.run()
+        failed_chunks = sum(1 for _, _, text in pipeline.results.values() if pipeline.is_failed(text))
+        matcher = create_keyword_matcher(keywords, settings)
+        outputs = write_results(base, transcription, formats, matcher,
+                                registry.component("file_handler"), os.path.basename(audio_file))
+    except Exception as e:
+        return {
+            'file': audio_file,
+            'ok': False,
+            'error': str(e),
+            'elapsed': time.perf_counter() - started,
+            'metrics': registry.snapshot()
+        }
+
+    elapsed = time.perf_counter() - started
+    return {
+        'file': audio_file,
+        # A file with segments the recognizer gave up on still counts as
+        # failed; its checkpoint is kept so a rerun retries only those
+        'ok': failed_chunks == 0,
+        'error': f"{failed_chunks} segments failed" if failed_chunks else None,
+        'duration': duration,
+        'elapsed': elapsed,
+        'segments': len(transcription),
+        'outputs': outputs,
+        'metrics': registry.snapshot()
+    }
+
+def format_result(result):
+    status = "OK" if result['ok'] else "FAILED"
+    line = f"[{status}] {result['file']}"
+    if 'duration' in result:
+        speed = result['duration'] / result['elapsed'] if result['elapsed'] else 0.0
+        line += (f" - {result['segments']} segments, audio {result['duration']:.1f} s"
+                 f" in {result['elapsed']:.1f} s ({speed:.2f}x realtime)")
+    if result['error']:
+        line += f" - {result['error']}"
+    return line
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Transcribe audio files without the GUI."
+    )
+    parser.add_argument('inputs', nargs='*', help="audio files or directories")
+    parser.add_argument('-m', '--manifest', help="text file with one audio path per line")
+    parser.add_argument('-o', '--output-dir', help="directory for results (default: next to each audio file)")
+    parser.add_argument('-f', '--format', default='csv',
+                        help="comma separated output formats: csv, jsonl (default: csv)")
+    parser.add_argument('-p', '--processes', type=int, default=os.cpu_count() or 1,
+                        help="number of files transcribed in parallel")
+    parser.add_argument('-s', '--settings', help="settings file (default: settings.json)")
+    parser.add_argument('-b', '--backend', help="recognizer backend, overrides the settings")
+    parser.add_argument('-k', '--keywords', help="keywords CSV used to fill the Keywords column")
+    parser.add_argument('--chunk-length-ms', type=int, default=30000,
+                        help="maximum length of one speech segment")
+    parser.add_argument('--metrics-file', help="write Prometheus metrics for the whole run to this file")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every segment")
+    return parser, parser.parse_args(argv)
+
+def main(argv=None):
+    parser, args = parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.format.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if not formats or unknown:
+        parser.print_usage(sys.stderr)
+        print(f"Unknown output format: {', '.join(unknown) or args.format}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.processes < 1:
+        parser.print_usage(sys.stderr)
+        print("--processes must be at least 1", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        audio_files = find_audio_files(args.inputs, args.manifest)
+    except OSError as e:
+        print(f"Error reading manifest: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+    if not audio_files:
+        parser.print_usage(sys.stderr)
+        print("No audio files to transcribe", file=sys.stderr)
+        return EXIT_USAGE
+
+    settings = load_settings(args.settings)
+    if args.backend:
+        settings["recognizer"]["backend"] = args.backend
+    keywords = FileHandler(None, args.keywords).load_keywords() if args.keywords else []
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    bases = output_paths(audio_files, args.output_dir)
+
+    started = time.perf_counter()
+    results = []
+    processes = min(args.processes, len(audio_files))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                transcribe_file, audio_file, bases[audio_file], formats, settings,
+                keywords, args.chunk_length_ms, args.verbose
+            )
+            for audio_file in audio_files
+        ]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                REGISTRY.merge(result.pop('metrics'))
+                results.append(result)
+                print(format_result(result), flush=True)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            print("Interrupted", file=sys.stderr)
+            return EXIT_FAILED
+
+    elapsed = time.perf_counter() - started
+    if args.metrics_file:
+        REGISTRY.write_prometheus(args.metrics_file)
+    failed = sum(1 for result in results if not result['ok'])
+    audio_seconds = sum(result.get('duration', 0.0) for result in results)
+    print(f"{len(results) - failed}/{len(results)} files done, audio {audio_seconds:.1f} s "
+          f"in {elapsed:.1f} s ({audio_seconds / elapsed if elapsed else 0.0:.2f}x realtime)")
+    return EXIT_FAILED if failed else EXIT_OK
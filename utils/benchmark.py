@@ -0,0 +1,470 @@
+# utils/benchmark.py
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import soundfile as sf
+import speech_recognition as sr
+from utils.audio_preprocessor import AudioPreprocessor, TARGET_SAMPLE_RATE
+from utils.file_handler import FileHandler
+from utils.keyword_matcher import FuzzyKeywordMatcher, KeywordMatcher
+from utils.recognizers import FakeBackend
+from utils.settings import DEFAULT_SETTINGS, merge_settings
+from utils.speech_segmenter import SpeechSegmenter
+from utils.transcription_pipeline import TranscriptionPipeline, SAMPLE_WIDTH
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RESULTS_VERSION = 1
+AUDIO_KINDS = ('speech', 'noisy', 'noise')
+AUDIO_STAGES = ('preprocess', 'segment', 'recognize', 'end_to_end')
+DATA_STAGES = ('keywords', 'fuzzy_keywords', 'csv_write', 'csv_read', 'journal')
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_USAGE = 2
+
+def synthesize_phrase(rng, frames, sample_rate):
+    # A voiced phrase: a harmonic series on a wavering pitch, chopped into
+    # syllables by a raised-cosine envelope
+    t = np.arange(frames) / sample_rate
+    base_pitch = rng.uniform(100, 220)
+    pitch = base_pitch * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = np.zeros(frames)
+    for harmonic in range(1, 9):
+        if harmonic * base_pitch * 1.05 < sample_rate / 2:
+            voiced += np.sin(harmonic * phase) / harmonic
+    syllables = (0.5 * (1 - np.cos(2 * np.pi * rng.uniform(3, 6) * t))) ** 2
+    return 0.3 * voiced * syllables / 2.7
+
+def generate_audio(path, seconds, sample_rate=16000, channels=1, kind='speech', seed=0):
+    # Writes a reproducible synthetic recording phrase by phrase, so long
+    # files never have to fit in memory. 'speech' has a faint noise floor,
+    # 'noisy' buries the same speech in noise at about 5 dB SNR and 'noise'
+    # has no speech at all
+    if kind not in AUDIO_KINDS:
+        raise ValueError(f"Unknown audio kind: {kind}")
+    rng = np.random.default_rng(seed)
+    noise_level = {'speech': 0.003, 'noisy': 0.05, 'noise': 0.05}[kind]
+    total_frames = int(seconds * sample_rate)
+
+    with sf.SoundFile(path, 'w', sample_rate, channels, subtype='PCM_16') as file:
+        written = 0
+        while written < total_frames:
+            speech_frames = int(rng.uniform(1.0, 6.0) * sample_rate)
+            pause_frames = int(rng.uniform(0.3, 1.5) * sample_rate)
+            frames = min(speech_frames + pause_frames, total_frames - written)
+
+            signal = np.zeros(frames)
+            if kind != 'noise':
+                voiced = min(speech_frames, frames)
+                signal[:voiced] = synthesize_phrase(rng, voiced, sample_rate)
+            block = signal[:, None] + noise_level * rng.standard_normal((frames, channels))
+            file.write(np.clip(block, -1.0, 1.0))
+            written += frames
+    return path
+
+def peak_rss_bytes():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and in kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        return None
+
+def summarize(latencies, wall_seconds, amount, unit):
+    latencies = np.asarray(latencies, dtype=np.float64) * 1000
+    summary = {
+        'unit': unit,
+        'amount': amount,
+        'items': len(latencies),
+        'wall_seconds': wall_seconds,
+        'throughput': amount / wall_seconds if wall_seconds else 0.0,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'latency_ms': None
+    }
+    if len(latencies):
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        summary['latency_ms'] = {
+            'p50': float(p50), 'p90': float(p90), 'p99': float(p99),
+            'max': float(latencies.max()), 'mean': float(latencies.mean())
+        }
+    return summary
+
+def timed_iter(iterable, latencies):
+    # Records how long producing every item took
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        latencies.append(time.perf_counter() - started)
+        yield item
+
+def preprocessed_path(workdir, kind):
+    # Raw int16 samples at TARGET_SAMPLE_RATE
+    return os.path.join(workdir, f"{kind}.pcm")
+
+def load_blocks(workdir, kind, block_seconds=30.0):
+    path = preprocessed_path(workdir, kind)
+    if not os.path.getsize(path):
+        return
+    samples = np.memmap(path, dtype=np.int16, mode='r')
+    block_samples = int(block_seconds * TARGET_SAMPLE_RATE)
+    for start in range(0, len(samples), block_samples):
+        yield np.asarray(samples[start:start + block_samples])
+
+def bench_preprocess(config, audio_file, workdir, kind):
+    preprocessor = AudioPreprocessor()
+    latencies = []
+    # Later stages start from this output instead of preprocessing again.
+    # Blocks are written as they arrive, so peak RSS is that of the
+    # streaming preprocessor and not of buffering its output
+    with open(preprocessed_path(workdir, kind), 'wb') as file:
+        started = time.perf_counter()
+        for block in timed_iter(preprocessor.stream(audio_file), latencies):
+            file.write(np.ascontiguousarray(block, dtype=np.int16).tobytes())
+        wall = time.perf_counter() - started
+    return summarize(latencies, wall, preprocessor.duration(audio_file), 'audio_s/s')
+
+def bench_segment(config, audio_file, workdir, kind):
+    segmenter = SpeechSegmenter(TARGET_SAMPLE_RATE)
+    latencies = []
+    started = time.perf_counter()
+    for _ in timed_iter(segmenter.segments(load_blocks(workdir, kind)), latencies):
+        pass
+    wall = time.perf_counter() - started
+    return summarize(latencies, wall, sf.info(audio_file).duration, 'audio_s/s')
+
+def bench_recognize(config, audio_file, workdir, kind):
+    segmenter = SpeechSegmenter(TARGET_SAMPLE_RATE)
+    segments = [np.array(view) for _, view in segmenter.segments(load_blocks(workdir, kind))]
+    backend = FakeBackend(latency=config['recognizer_latency'], seed=config['seed'])
+    latencies = []
+    started = time.perf_counter()
+    for segment in segments:
+        audio = sr.AudioData(memoryview(segment).cast('B'), TARGET_SAMPLE_RATE, SAMPLE_WIDTH)
+        call_started = time.perf_counter()
+        backend.try_recognize(audio)
+        latencies.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+    speech_seconds = sum(len(segment) for segment in segments) / TARGET_SAMPLE_RATE
+    return summarize(latencies, wall, speech_seconds, 'audio_s/s')
+
+def bench_end_to_end(config, audio_file, workdir, kind):
+    settings = merge_settings(DEFAULT_SETTINGS, {'cache': {'enabled': False}})
+    pipeline = TranscriptionPipeline(
+        audio_file,
+        max_workers=config['workers'],
+        backend=FakeBackend(latency=config['recognizer_latency'], seed=config['seed']),
+        settings=settings,
+        checkpoint_file=os.path.join(workdir, f"{kind}.progress.jsonl")
+    )
+    # Per-segment latency covers recognition including retries
+    latencies = []
+    transcribe_audio_chunk = pipeline.transcribe_audio_chunk
+
+    def timed_transcribe(chunk):
+        call_started = time.perf_counter()
+        text = transcribe_audio_chunk(chunk)
+        latencies.append(time.perf_counter() - call_started)
+        return text
+
+    pipeline.transcribe_audio_chunk = timed_transcribe
+    started = time.perf_counter()
+    pipeline.run()
+    wall = time.perf_counter() - started
+    return summarize(latencies, wall, sf.info(audio_file).duration, 'audio_s/s')
+
+def synthetic_keywords(count, seed):
+    rng = random.Random(seed)
+    keywords = list(FakeBackend.VOCABULARY)
+    letters = 'abcdeghijklmnoprstuwy'
+    while len(keywords) < count:
+        keywords.append(''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return keywords[:count]
+
+def synthetic_texts(count, seed, words=12):
+    rng = random.Random(seed + 1)
+    vocabulary = FakeBackend.VOCABULARY + synthetic_keywords(200, seed)[len(FakeBackend.VOCABULARY):]
+    return [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(count)]
+
+def synthetic_records(count, seed):
+    texts = synthetic_texts(count, seed)
+    return [
+        {
+            'timestamp': time.strftime("%H:%M:%S", time.gmtime(index)),
+            'text': text,
+            'keywords': text.split()[:2]
+        }
+        for index, text in enumerate(texts)
+    ]
+
+def bench_keywords(config, workdir, matcher_class=KeywordMatcher):
+    build_started = time.perf_counter()
+    matcher = matcher_class(synthetic_keywords(config['keywords'], config['seed']))
+    matcher.matched_keywords("")
+    build_seconds = time.perf_counter() - build_started
+
+    texts = synthetic_texts(config['texts'], config['seed'])
+    latencies = []
+    started = time.perf_counter()
+    for text in texts:
+        call_started = time.perf_counter()
+        matcher.matched_keywords(text)
+        latencies.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+    summary = summarize(latencies, wall, len(texts), 'texts/s')
+    summary['build_seconds'] = build_seconds
+    return summary
+
+def bench_fuzzy_keywords(config, workdir):
+    # Without a time budget, so the full cost of fuzzy matching is measured
+    return bench_keywords(config, workdir,
+                          lambda keywords: FuzzyKeywordMatcher(keywords, time_budget_ms=None))
+
+def records_path(workdir):
+    return os.path.join(workdir, "records.csv")
+
+def bench_csv_write(config, workdir):
+    records = synthetic_records(config['records'], config['seed'])
+    started = time.perf_counter()
+    FileHandler(records_path(workdir), None).save_recorded(records)
+    wall = time.perf_counter() - started
+    return summarize([], wall, len(records), 'records/s')
+
+def bench_csv_read(config, workdir):
+    path = records_path(workdir)
+    if not os.path.exists(path):
+        FileHandler(path, None).save_recorded(synthetic_records(config['records'], config['seed']))
+    latencies = []
+    started = time.perf_counter()
+    count = sum(1 for _ in timed_iter(FileHandler(path, None).iter_recorded(), latencies))
+    wall = time.perf_counter() - started
+    return summarize(latencies, wall, count, 'records/s')
+
+def bench_journal(config, workdir):
+    records = synthetic_records(config['records'], config['seed'])
+    file_handler = FileHandler(os.path.join(workdir, "journal.csv"), None)
+    file_handler.open_journal()
+    latencies = []
+    started = time.perf_counter()
+    for record in records:
+        call_started = time.perf_counter()
+        file_handler.append_recorded(record)
+        latencies.append(time.perf_counter() - call_started)
+    # Includes draining the journal to disk
+    file_handler.close()
+    wall = time.perf_counter() - started
+    return summarize(latencies, wall, len(records), 'records/s')
+
+AUDIO_BENCHMARKS = {
+    'preprocess': bench_preprocess,
+    'segment': bench_segment,
+    'recognize': bench_recognize,
+    'end_to_end': bench_end_to_end
+}
+
+DATA_BENCHMARKS = {
+    'keywords': bench_keywords,
+    'fuzzy_keywords': bench_fuzzy_keywords,
+    'csv_write': bench_csv_write,
+    'csv_read': bench_csv_read,
+    'journal': bench_journal
+}
+
+def run_stage(stage, config, workdir, kind=None, audio_file=None):
+    # Runs in a fresh process so peak RSS belongs to this stage alone
+    if kind is None:
+        return DATA_BENCHMARKS[stage](config, workdir)
+    return AUDIO_BENCHMARKS[stage](config, audio_file, workdir, kind)
+
+def run_isolated(*args):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_stage, *args).result()
+
+def run_benchmarks(config, workdir, log=print):
+    results = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count()
+        },
+        'config': config,
+        'stages': {}
+    }
+
+    audio_stages = [stage for stage in AUDIO_STAGES if stage in config['stages']]
+    # Later audio stages read the output of preprocess
+    if audio_stages and 'preprocess' not in audio_stages:
+        audio_stages.insert(0, 'preprocess')
+    for kind in config['kinds'] if audio_stages else []:
+        audio_file = os.path.join(workdir, f"{kind}.wav")
+        generate_audio(audio_file, config['seconds'], config['sample_rate'],
+                       config['channels'], kind, config['seed'])
+        for stage in audio_stages:
+            name = f"{kind}/{stage}"
+            log(f"Running {name}...")
+            summary = run_isolated(stage, config, workdir, kind, audio_file)
+            if stage in config['stages']:
+                results['stages'][name] = summary
+                log(format_summary(name, summary))
+
+    for stage in DATA_STAGES:
+        if stage in config['stages']:
+            log(f"Running {stage}...")
+            summary = run_isolated(stage, config, workdir)
+            results['stages'][stage] = summary
+            log(format_summary(stage, summary))
+    return results
+
+def format_summary(name, summary):
+    line = f"{name}: {summary['throughput']:.2f} {summary['unit']}"
+    if summary['latency_ms']:
+        latency = summary['latency_ms']
+        line += f", p50 {latency['p50']:.3f} ms, p90 {latency['p90']:.3f} ms, p99 {latency['p99']:.3f} ms"
+    if summary['peak_rss_bytes']:
+        line += f", peak RSS {summary['peak_rss_bytes'] / 1024 ** 2:.1f} MiB"
+    return line
+
+def compare(results, baseline, max_slowdown=0.10, max_latency_growth=0.25,
+            max_memory_growth=0.25, min_latency_ms=0.1):
+    # Returns one message per stage metric that got worse than allowed.
+    # Latencies below min_latency_ms are timer noise and never flagged
+    regressions = []
+    for name, summary in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base:
+            continue
+        if base['throughput'] and summary['throughput'] < base['throughput'] * (1 - max_slowdown):
+            regressions.append(
+                f"{name}: throughput {summary['throughput']:.2f} {summary['unit']}, "
+                f"baseline {base['throughput']:.2f}")
+        if summary['latency_ms'] and base.get('latency_ms'):
+            new_p90 = summary['latency_ms']['p90']
+            base_p90 = base['latency_ms']['p90']
+            if new_p90 > max(base_p90 * (1 + max_latency_growth), min_latency_ms):
+                regressions.append(f"{name}: p90 latency {new_p90:.3f} ms, baseline {base_p90:.3f} ms")
+        if summary['peak_rss_bytes'] and base.get('peak_rss_bytes'):
+            if summary['peak_rss_bytes'] > base['peak_rss_bytes'] * (1 + max_memory_growth):
+                regressions.append(
+                    f"{name}: peak RSS {summary['peak_rss_bytes'] / 1024 ** 2:.1f} MiB, "
+                    f"baseline {base['peak_rss_bytes'] / 1024 ** 2:.1f} MiB")
+    return regressions
+
+def parse_list(value, choices):
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in items if item not in choices]
+    if not items or unknown:
+        raise argparse.ArgumentTypeError(
+            f"expected a comma separated list of {', '.join(choices)}")
+    return items
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Benchmark preprocessing, segmentation, recognition, keyword "
+                    "matching and record I/O on synthetic data."
+    )
+    stages = AUDIO_STAGES + DATA_STAGES
+    parser.add_argument('--stages', default=','.join(stages),
+                        type=lambda value: parse_list(value, stages),
+                        help=f"stages to run (default: all of {', '.join(stages)})")
+    parser.add_argument('--kinds', default='speech,noisy',
+                        type=lambda value: parse_list(value, AUDIO_KINDS),
+                        help="synthetic audio kinds: speech, noisy, noise (default: speech,noisy)")
+    parser.add_argument('--seconds', type=float, default=120.0, help="length of each synthetic file")
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=DEFAULT_SETTINGS["recognizer"]["max_workers"],
+                        help="recognizer threads for end_to_end")
+    parser.add_argument('--recognizer-latency', type=float, default=0.0,
+                        help="seconds the stub recognizer sleeps per request")
+    parser.add_argument('--keywords', type=int, default=5000, help="keyword count for the keyword stages")
+    parser.add_argument('--texts', type=int, default=20000, help="texts matched by the keyword stages")
+    parser.add_argument('--records', type=int, default=100000, help="records for the CSV stages")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help="directory for generated files (default: a temporary one)")
+    parser.add_argument('-o', '--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--max-slowdown', type=float, default=0.10,
+                        help="allowed throughput drop against the baseline (default: 0.10)")
+    parser.add_argument('--max-latency-growth', type=float, default=0.25,
+                        help="allowed p90 latency growth against the baseline (default: 0.25)")
+    parser.add_argument('--max-memory-growth', type=float, default=0.25,
+                        help="allowed peak RSS growth against the baseline (default: 0.25)")
+    return parser, parser.parse_args(argv)
+
+def main(argv=None):
+    parser, args = parse_args(argv)
+    if args.seconds <= 0 or args.sample_rate <= 0 or args.channels < 1 or args.workers < 1:
+        parser.print_usage(sys.stderr)
+        print("--seconds, --sample-rate, --channels and --workers must be positive", file=sys.stderr)
+        return EXIT_USAGE
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error reading baseline: {str(e)}", file=sys.stderr)
+            return EXIT_USAGE
+
+    config = {
+        'stages': args.stages,
+        'kinds': args.kinds,
+        'seconds': args.seconds,
+        'sample_rate': args.sample_rate,
+        'channels': args.channels,
+        'workers': args.workers,
+        'recognizer_latency': args.recognizer_latency,
+        'keywords': args.keywords,
+        'texts': args.texts,
+        'records': args.records,
+        'seed': args.seed
+    }
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = run_benchmarks(config, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="stt-benchmark-") as workdir:
+            results = run_benchmarks(config, workdir)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if baseline is None:
+        return EXIT_OK
+    if baseline.get('config') != config:
+        print("Warning: baseline was recorded with a different configuration")
+    regressions = compare(results, baseline, args.max_slowdown,
+                          args.max_latency_growth, args.max_memory_growth)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against the baseline")
+    return EXIT_REGRESSION if regressions else EXIT_OK
@@ -1,10 +1,147 @@
 import csv
+import hashlib
+import io
+import os
+import queue
+import re
+import threading
+import time
 from datetime import datetime
+from utils.metrics import REGISTRY
+
+RECORD_HEADER = ['Timestamp', 'Text', 'Keywords', 'Source', 'Recorded At']
+KEYWORD_SEPARATOR = ';'
+# Recorded At as format_record_row writes it
+RECORDED_AT_PATTERN = re.compile(r'\d+\.\d{3}')
+
+def record_digest(record):
+    # Identity of a record for deduplication: its timestamp and text
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(record['timestamp'].encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(record['text'].encode('utf-8'))
+    return digest.digest()
+
+def parse_recorded_at(value):
+    # Epoch seconds, or None for rows written before the column existed
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+class RecordJournal:
+    # Appends record rows to the end of the CSV from a background thread.
+    # Rows are written as they arrive, flushed at most every flush_interval
+    # seconds and fsynced every fsync_interval seconds (None disables the
+    # periodic fsync; the file is always synced on close)
+    STOP = object()
+
+    def __init__(self, path, flush_interval=1.0, fsync_interval=5.0, metrics=None):
+        self.path = path
+        self.metrics = metrics or REGISTRY.component("file_handler")
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.queue = queue.Queue()
+        self.recover()
+        self.file = open(path, 'a', newline='')
+        self.writer = csv.writer(self.file)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def recover(self):
+        # A crash can leave a partially written last row. If the file
+        # doesn't end with a newline, the last line is kept only when it is a
+        # whole row as format_record_row writes it, all of RECORD_HEADER's
+        # fields with a Recorded At of three decimals; otherwise the file is
+        # truncated back to the last complete line
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'w', newline='') as file:
+                csv.writer(file).writerow(RECORD_HEADER)
+            return
+
+        with open(self.path, 'rb+') as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            file.seek(size - 1)
+            if file.read(1) == b'\n':
+                return
+
+            position = size
+            line_start = 0
+            while position > 0:
+                step = min(65536, position)
+                position -= step
+                file.seek(position)
+                newline = file.read(step).rfind(b'\n')
+                if newline != -1:
+                    line_start = position + newline + 1
+                    break
+
+            file.seek(line_start)
+            last_line = file.read().decode('utf-8', errors='replace')
+            rows = list(csv.reader(io.StringIO(last_line)))
+            if (line_start > 0 and len(rows) == 1 and len(rows[0]) == len(RECORD_HEADER)
+                    and RECORDED_AT_PATTERN.fullmatch(rows[0][-1])):
+                file.write(b'\r\n')
+            else:
+                file.seek(line_start)
+                file.truncate()
+                if line_start == 0:
+                    file.write(','.join(RECORD_HEADER).encode() + b'\r\n')
+
+    def append(self, row):
+        self.queue.put(row)
+
+    def run(self):
+        last_flush = last_sync = time.monotonic()
+        unflushed = unsynced = False
+        while True:
+            timeout = None
+            if unflushed:
+                timeout = self.flush_interval
+            elif unsynced and self.fsync_interval is not None:
+                timeout = self.fsync_interval
+            try:
+                row = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                row = None
+
+            if row is self.STOP:
+                break
+            if row is not None:
+                self.writer.writerow(row)
+                unflushed = unsynced = True
+                self.metrics.inc('records_written_total')
+                self.metrics.set('queue_depth', self.queue.qsize(), queue='journal')
+
+            now = time.monotonic()
+            if unflushed and now - last_flush >= self.flush_interval:
+                with self.metrics.span('journal_flush'):
+                    self.file.flush()
+                unflushed = False
+                last_flush = now
+            if (not unflushed and unsynced and self.fsync_interval is not None
+                    and now - last_sync >= self.fsync_interval):
+                with self.metrics.span('journal_fsync'):
+                    os.fsync(self.file.fileno())
+                unsynced = False
+                last_sync = now
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    def close(self):
+        self.queue.put(self.STOP)
+        self.thread.join()
+
 
 class FileHandler:
-    def __init__(self, record_file, keywords_file):
+    def __init__(self, record_file, keywords_file, metrics=None):
         self.record_file = record_file
         self.keywords_file = keywords_file
+        self.journal = None
+        self.metrics = metrics or REGISTRY.component("file_handler")
 
     def load_keywords(self):
         try:
@@ -20,9 +157,54 @@ class FileHandler:
             for kw in keywords:
                 writer.writerow([kw])
 
+    def parse_record_row(self, row):
+        if len(row) >= 2:
+            text = row[1]
+            if text.startswith('[') and '] ' in text:
+                text = text.split('] ', 1)[1]
+            keywords = row[2].split(KEYWORD_SEPARATOR) if len(row) >= 3 else []
+            return {
+                'timestamp': row[0],
+                'text': text,
+                'keywords': [kw for kw in keywords if kw],
+                'source': row[3] if len(row) >= 4 else '',
+                'recorded_at': parse_recorded_at(row[4]) if len(row) >= 5 else None
+            }
+        elif len(row) == 1:
+            return {
+                'timestamp': datetime.now().strftime("%H:%M:%S"),
+                'text': row[0],
+                'keywords': [],
+                'source': '',
+                'recorded_at': None
+            }
+        return None
+
+    def iter_recorded(self, on_progress=None):
+        # Yields records one row at a time without loading the whole file.
+        # on_progress is called with the number of bytes read so far every
+        # few thousand rows
+        with open(self.record_file, 'r', newline='') as file:
+            reader = csv.reader(file)
+            headers = next(reader, None)
+            if headers is None:
+                return
+            if headers[:2] != RECORD_HEADER[:2]:
+                # No proper header, treat first line as data
+                record = self.parse_record_row(headers)
+                if record:
+                    yield record
+            for row in reader:
+                record = self.parse_record_row(row)
+                if record:
+                    yield record
+                if on_progress and reader.line_num % 4096 == 0:
+                    on_progress(file.buffer.tell())
+            if on_progress:
+                on_progress(file.buffer.tell())
+
     def load_recorded(self):
         try:
-            records = []
             try:
                 with open(self.record_file, 'r') as file:
                     # Check if file is empty
@@ -30,31 +212,9 @@ class FileHandler:
                     if not first_line:  # File is empty
                         self.create_file_with_header()
                         return []
-                    
-                    # Reset file pointer to start
-                    file.seek(0)
-                    
-                    # Check if header exists
-                    reader = csv.reader(file)
-                    headers = next(reader)
-                    if len(headers) < 2 or headers != ['Timestamp', 'Text']:
-                        # No proper header, treat first line as data
-                        file.seek(0)
-                        
-                    # Read all records
-                    for row in reader:
-                        if len(row) >= 2:
-                            text = row[1]
-                            if text.startswith('[') and '] ' in text:
-                                text = text.split('] ', 1)[1]
-                            records.append({'timestamp': row[0], 'text': text})
-                        elif len(row) == 1:
-                            records.append({
-                                'timestamp': datetime.now().strftime("%H:%M:%S"),
-                                'text': row[0]
-                            })
-                            
-                    return records
+                
+                with self.metrics.span('load_records'):
+                    return list(self.iter_recorded())
                     
             except FileNotFoundError:
                 self.create_file_with_header()
@@ -68,11 +228,48 @@ class FileHandler:
     def create_file_with_header(self):
         with open(self.record_file, 'w', newline='') as file:
             writer = csv.writer(file)
-            writer.writerow(['Timestamp', 'Text'])
+            writer.writerow(RECORD_HEADER)
+
+    def format_record_row(self, record):
+        keywords = KEYWORD_SEPARATOR.join(record.get('keywords', []))
+        recorded_at = record.get('recorded_at')
+        return [record['timestamp'], record['text'], keywords, record.get('source', ''),
+                f"{recorded_at:.3f}" if recorded_at else '']
 
     def save_recorded(self, recorded_logs):
-        with open(self.record_file, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Timestamp', 'Text'])
-            for record in recorded_logs:
-                writer.writerow([record['timestamp'], record['text']])
\ No newline at end of file
+        # Written to a temporary file and swapped in, so a crash mid-write
+        # never leaves a half-written record file behind
+        temp_file = f"{self.record_file}.tmp"
+        with self.metrics.span('save_records'):
+            count = 0
+            with open(temp_file, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(RECORD_HEADER)
+                for record in recorded_logs:
+                    writer.writerow(self.format_record_row(record))
+                    count += 1
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_file, self.record_file)
+        self.metrics.inc('records_written_total', count)
+
+    def open_journal(self, flush_interval=1.0, fsync_interval=5.0):
+        if self.journal is None:
+            self.journal = RecordJournal(self.record_file, flush_interval, fsync_interval, self.metrics)
+
+    def append_recorded(self, record):
+        if self.journal is not None:
+            self.journal.append(self.format_record_row(record))
+            return
+        with open(self.record_file, 'a', newline='') as file:
+            csv.writer(file).writerow(self.format_record_row(record))
+        self.metrics.inc('records_written_total')
+
+    def close(self, recorded_logs=None):
+        # Stops the journal and, when records are given, compacts the file by
+        # rewriting it from them
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if recorded_logs is not None:
+            self.save_recorded(recorded_logs)
\ No newline at end of file
@@ -0,0 +1,332 @@
+# utils/keyword_matcher.py
+import re
+import threading
+import time
+from collections import Counter, deque
+
+class KeywordMatcher:
+    # Aho-Corasick automaton over case-folded keywords. Adding or removing a
+    # keyword only touches its path in the trie; failure links are
+    # recomputed lazily before the next search
+    def __init__(self, keywords=(), whole_word=False):
+        self.whole_word = whole_word
+        self.lock = threading.Lock()
+        self.goto = [{}]
+        self.terminal = [set()]
+        self.fail = [0]
+        self.outputs = [()]
+        self.keywords = {}   # original keyword -> folded form
+        self.originals = {}  # folded form -> original keywords
+        self.compiled = True
+        for keyword in keywords:
+            self.add(keyword)
+
+    def fold(self, text):
+        # Returns the case-folded text and, when folding changes the length
+        # (e.g. "ß" -> "ss"), the index of the source character for every
+        # folded character
+        if text.isascii():
+            return text.lower(), None
+        folded = []
+        index = []
+        for i, char in enumerate(text):
+            char = char.casefold()
+            folded.append(char)
+            index.extend([i] * len(char))
+        return "".join(folded), index
+
+    def add(self, keyword):
+        folded, _ = self.fold(keyword.strip())
+        if not folded:
+            return
+        with self.lock:
+            if keyword in self.keywords:
+                return
+            node = 0
+            for char in folded:
+                child = self.goto[node].get(char)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][char] = child
+                    self.goto.append({})
+                    self.terminal.append(set())
+                node = child
+            self.terminal[node].add(folded)
+            self.keywords[keyword] = folded
+            self.originals.setdefault(folded, []).append(keyword)
+            self.compiled = False
+
+    def remove(self, keyword):
+        with self.lock:
+            folded = self.keywords.pop(keyword, None)
+            if folded is None:
+                return
+            self.originals[folded].remove(keyword)
+            if self.originals[folded]:
+                return
+            del self.originals[folded]
+            node = 0
+            for char in folded:
+                node = self.goto[node][char]
+            self.terminal[node].discard(folded)
+            self.compiled = False
+
+    def compile(self):
+        # Breadth-first pass that sets failure links and merges each node's
+        # outputs with those reachable through its failure link
+        count = len(self.goto)
+        self.fail = [0] * count
+        self.outputs = [()] * count
+        self.outputs[0] = tuple(self.terminal[0])
+        queue = deque()
+        for child in self.goto[0].values():
+            self.outputs[child] = tuple(self.terminal[child])
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                self.outputs[child] = tuple(self.terminal[child]) + self.outputs[self.fail[child]]
+                queue.append(child)
+        self.compiled = True
+
+    def is_word_boundary(self, text, start, end):
+        before = start == 0 or not text[start - 1].isalnum()
+        after = end == len(text) or not text[end].isalnum()
+        return before and after
+
+    def find(self, text):
+        # Returns (keyword, start, end) for every occurrence, with offsets
+        # into the original text
+        folded, index = self.fold(text)
+        matches = []
+        with self.lock:
+            if not self.compiled:
+                self.compile()
+            goto, fail, outputs = self.goto, self.fail, self.outputs
+            node = 0
+            for i, char in enumerate(folded):
+                while node and char not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(char, 0)
+                for key in outputs[node]:
+                    start = i - len(key) + 1
+                    if index is None:
+                        end = i + 1
+                    else:
+                        start, end = index[start], index[i] + 1
+                    if self.whole_word and not self.is_word_boundary(text, start, end):
+                        continue
+                    for keyword in self.originals[key]:
+                        matches.append((keyword, start, end))
+        matches.sort(key=lambda match: (match[1], match[2]))
+        return matches
+
+    def matched_keywords(self, text):
+        # Unique matched keywords in order of first occurrence
+        seen = []
+        for keyword, _, _ in self.find(text):
+            if keyword not in seen:
+                seen.append(keyword)
+        return seen
+
+
+WORD_PATTERN = re.compile(r"\w+")
+REPEATED_PATTERN = re.compile(r"(.)\1+")
+
+# Spelling variants (old and new Indonesian spelling, loan words) that ASR
+# output mixes up, reduced to one form before comparing
+PHONETIC_RULES = (
+    ('dj', 'j'), ('tj', 'c'), ('ch', 'c'), ('sj', 'sy'), ('nj', 'ny'), ('oe', 'u'),
+    ('ph', 'f'), ('kh', 'k'), ('sy', 's'), ('ck', 'k'), ('q', 'k'), ('x', 'ks'),
+    ('v', 'f'), ('z', 's')
+)
+
+def phonetic_key(word):
+    # Rough phonetic form of a case-folded word: spelling variants are
+    # unified and doubled letters collapsed ("speed" -> "sped")
+    for source, target in PHONETIC_RULES:
+        word = word.replace(source, target)
+    return REPEATED_PATTERN.sub(r"\1", word)
+
+def bounded_distance(a, b, limit):
+    # Levenshtein distance, or limit + 1 as soon as it must exceed limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        best = i
+        for j, char_b in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            current.append(value)
+            best = min(best, value)
+        if best > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyKeywordMatcher:
+    # Exact matches from KeywordMatcher plus near-hits that tolerate ASR
+    # errors. Keywords are indexed by the character trigrams of their
+    # normalized (and optionally phonetic) form, grouped by word count and
+    # length. A window of words only looks up keywords of as many words and
+    # of a length within the allowed edit distance, through its rarest
+    # trigrams, and verifies those that share enough trigrams. Scores are
+    # 1 - distance / length and threshold is the lowest score accepted.
+    # Fuzzy matching of one text stops once time_budget_ms is spent, counted
+    # in budget_exceeded
+    GRAM = 3
+
+    def __init__(self, keywords=(), whole_word=False, threshold=0.8, phonetic=True,
+                 min_length=4, time_budget_ms=5.0):
+        self.exact = KeywordMatcher(whole_word=whole_word)
+        self.threshold = threshold
+        self.phonetic = phonetic
+        self.min_length = min_length
+        self.time_budget = time_budget_ms / 1000 if time_budget_ms else None
+        self.lock = threading.Lock()
+        self.entries = {}      # keyword -> (normalized form, its trigrams)
+        self.index = {}        # (word count, length) -> trigram -> keywords
+        self.word_counts = Counter()
+        self.budget_exceeded = 0
+        for keyword in keywords:
+            self.add(keyword)
+
+    def normalize_word(self, word):
+        word = word.casefold()
+        return phonetic_key(word) if self.phonetic else word
+
+    def normalize(self, text):
+        return " ".join(self.normalize_word(word) for word in WORD_PATTERN.findall(text))
+
+    def trigrams(self, normalized):
+        padded = f"  {normalized} "
+        return {padded[i:i + self.GRAM] for i in range(len(padded) - self.GRAM + 1)}
+
+    def add(self, keyword):
+        self.exact.add(keyword)
+        normalized = self.normalize(keyword)
+        with self.lock:
+            if keyword in self.entries or len(normalized) < self.min_length:
+                return
+            grams = self.trigrams(normalized)
+            self.entries[keyword] = (normalized, grams)
+            words = normalized.count(" ") + 1
+            self.word_counts[words] += 1
+            index = self.index.setdefault((words, len(normalized)), {})
+            for gram in grams:
+                index.setdefault(gram, set()).add(keyword)
+
+    def remove(self, keyword):
+        self.exact.remove(keyword)
+        with self.lock:
+            entry = self.entries.pop(keyword, None)
+            if entry is None:
+                return
+            normalized, grams = entry
+            words = normalized.count(" ") + 1
+            self.word_counts[words] -= 1
+            index = self.index[(words, len(normalized))]
+            for gram in grams:
+                index[gram].discard(keyword)
+                if not index[gram]:
+                    del index[gram]
+            if not index:
+                del self.index[(words, len(normalized))]
+
+    def allowed_distance(self, length):
+        return int((1 - self.threshold) * length + 1e-9)
+
+    def candidates(self, window, words, grams):
+        # Keywords that can be within the allowed distance of window. Every
+        # edit removes at most GRAM distinct trigrams, so a keyword within
+        # limit edits shares at least len(grams) - limit * GRAM of the
+        # window's distinct trigrams, and therefore at least one of any
+        # limit * GRAM + 1 of them: only the rarest that many are looked up
+        for (count, length), index in self.index.items():
+            if count != words:
+                continue
+            longest = max(len(window), length)
+            limit = self.allowed_distance(longest)
+            if abs(len(window) - length) > limit:
+                continue
+            lost = limit * self.GRAM
+            if len(grams) <= lost:
+                probes = index.values()
+            else:
+                probes = sorted((index.get(gram, ()) for gram in grams), key=len)[:lost + 1]
+            found = set()
+            for keywords in probes:
+                found.update(keywords)
+            for keyword in found:
+                normalized, keyword_grams = self.entries[keyword]
+                if len(grams & keyword_grams) >= max(len(grams), len(keyword_grams)) - lost:
+                    yield keyword, normalized, longest, limit
+
+    def fuzzy_find(self, text):
+        # Returns (keyword, start, end, score) for near-hits in text
+        words = [(match.start(), match.end(), self.normalize_word(match.group()))
+                 for match in WORD_PATTERN.finditer(text)]
+        deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+        matches = []
+        with self.lock:
+            word_counts = [count for count, total in self.word_counts.items() if total > 0]
+            for count in word_counts:
+                for i in range(len(words) - count + 1):
+                    if deadline and time.perf_counter() > deadline:
+                        self.budget_exceeded += 1
+                        return matches
+                    window = " ".join(word for _, _, word in words[i:i + count])
+                    if len(window) < self.min_length:
+                        continue
+                    grams = self.trigrams(window)
+                    for keyword, normalized, longest, limit in self.candidates(window, count, grams):
+                        distance = bounded_distance(window, normalized, limit)
+                        if distance <= limit:
+                            start, end = words[i][0], words[i + count - 1][1]
+                            matches.append((keyword, start, end, 1 - distance / longest))
+        return matches
+
+    def find_scored(self, text):
+        # Returns (keyword, start, end, score) for every match. Near-hits of a
+        # keyword that overlap an exact match of it are left out
+        matches = [(keyword, start, end, 1.0) for keyword, start, end in self.exact.find(text)]
+        exact = {}
+        for keyword, start, end, _ in matches:
+            exact.setdefault(keyword, []).append((start, end))
+        for keyword, start, end, score in self.fuzzy_find(text):
+            spans = exact.get(keyword, ())
+            if not any(start < other_end and other_start < end for other_start, other_end in spans):
+                matches.append((keyword, start, end, score))
+        matches.sort(key=lambda match: (match[1], match[2]))
+        return matches
+
+    def find(self, text):
+        return [(keyword, start, end) for keyword, start, end, _ in self.find_scored(text)]
+
+    def matched_keywords(self, text):
+        # Unique matched keywords in order of first occurrence
+        seen = []
+        for keyword, _, _ in self.find(text):
+            if keyword not in seen:
+                seen.append(keyword)
+        return seen
+
+
+def create_keyword_matcher(keywords, settings):
+    config = settings["keywords"]
+    if not config["fuzzy"]:
+        return KeywordMatcher(keywords, whole_word=config["whole_word"])
+    return FuzzyKeywordMatcher(
+        keywords,
+        whole_word=config["whole_word"],
+        threshold=config["threshold"],
+        phonetic=config["phonetic"],
+        min_length=config["min_length"],
+        time_budget_ms=config["time_budget_ms"]
+    )
@@ -0,0 +1,164 @@
+# utils/keyword_stats.py
+import json
+import os
+import threading
+from datetime import datetime
+
+STATS_VERSION = 1
+
+def stats_path(record_file):
+    # The statistics live next to the record file they summarize
+    return f"{record_file}.stats.json"
+
+def file_date(path):
+    # Date given to records that only carry a time of day, as in
+    # SQLiteRecordStore.import_csv
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+
+class KeywordStats:
+    # Keyword hit counts over the whole record history: a total per keyword
+    # and a count per day and per hour of the day, kept up to date as records
+    # are added so every query is a dictionary lookup. Records are bucketed
+    # by recorded_at, which live records and imports always get before they
+    # are stored; only rows written before records carried it fall back to
+    # their time of day on the given date. The counts are saved as compact JSON
+    # together with the number of records they cover, and rebuilt from the
+    # store in one pass when that number no longer matches
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.records = 0
+        self.totals = {}  # keyword -> hits
+        self.days = {}    # keyword -> date -> hits
+        self.hours = {}   # keyword -> date -> hits per hour of the day
+
+    def record_time(self, record, date):
+        # (date, hour) of a record; hour is None for an unreadable timestamp
+        recorded_at = record.get('recorded_at')
+        if recorded_at:
+            moment = datetime.fromtimestamp(recorded_at)
+            return moment.strftime("%Y-%m-%d"), moment.hour
+        hour = record['timestamp'].split(':', 1)[0]
+        if hour.isdigit() and int(hour) < 24:
+            return date, int(hour)
+        return date, None
+
+    def add_unlocked(self, record, date):
+        self.records += 1
+        keywords = record.get('keywords')
+        if not keywords:
+            return
+        day, hour = self.record_time(record, date)
+        for keyword in set(keywords):
+            self.totals[keyword] = self.totals.get(keyword, 0) + 1
+            days = self.days.setdefault(keyword, {})
+            days[day] = days.get(day, 0) + 1
+            if hour is not None:
+                self.hours.setdefault(keyword, {}).setdefault(day, [0] * 24)[hour] += 1
+
+    def add(self, record, date=None):
+        self.add_records([record], date)
+
+    def add_records(self, records, date=None):
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        with self.lock:
+            for record in records:
+                self.add_unlocked(record, date)
+
+    def total(self, keyword):
+        return self.totals.get(keyword, 0)
+
+    def day_count(self, keyword, date):
+        return self.days.get(keyword, {}).get(date, 0)
+
+    def hour_count(self, keyword, date, hour):
+        counts = self.hours.get(keyword, {}).get(date)
+        return counts[hour] if counts else 0
+
+    def hourly(self, keyword, date):
+        return list(self.hours.get(keyword, {}).get(date, [0] * 24))
+
+    def rebuild(self, records, date=None):
+        # One pass over the records; the old counts stay visible until the
+        # new ones are complete
+        stats = KeywordStats()
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        for record in records:
+            stats.add_unlocked(record, date)
+        with self.lock:
+            self.records = stats.records
+            self.totals = stats.totals
+            self.days = stats.days
+            self.hours = stats.hours
+
+    def sync(self, record_store, date=None):
+        # Rebuilds when the store holds records these counts haven't seen,
+        # e.g. after a crash or records written by replay.py. Returns
+        # whether a rebuild was needed
+        if self.records == record_store.count():
+            return False
+        self.rebuild(record_store.iter_records(), date)
+        return True
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except Exception as e:
+            print(f"Error loading keyword statistics: {str(e)}")
+            return False
+        if data.get('version') != STATS_VERSION:
+            return False
+
+        with self.lock:
+            self.reset()
+            self.records = data['records']
+            for keyword, days in data['keywords'].items():
+                self.days[keyword] = {day: entry[0] for day, entry in days.items()}
+                self.totals[keyword] = sum(self.days[keyword].values())
+                hours = {day: entry[1] for day, entry in days.items() if len(entry) > 1}
+                if hours:
+                    self.hours[keyword] = hours
+        return True
+
+    def save(self):
+        # Each day is stored as [hits] or [hits, hits per hour]. Written to a
+        # temporary file and swapped in, so a crash never leaves a partial file
+        if not self.path:
+            return
+        with self.lock:
+            data = {
+                'version': STATS_VERSION,
+                'records': self.records,
+                'keywords': {
+                    keyword: {
+                        day: [count, self.hours[keyword][day]]
+                        if day in self.hours.get(keyword, {}) else [count]
+                        for day, count in days.items()
+                    }
+                    for keyword, days in self.days.items()
+                }
+            }
+        temp_file = f"{self.path}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.path)
+        except OSError as e:
+            print(f"Error saving keyword statistics: {str(e)}")
+
+
+def open_keyword_stats(record_file, record_store):
+    # Loads the saved counts for record_file and brings them up to date.
+    # Records of a CSV store have no date, so a rebuild dates them with the
+    # file's modification date
+    stats = KeywordStats(stats_path(record_file))
+    stats.load()
+    date = file_date(record_file) if os.path.exists(record_file) else None
+    stats.sync(record_store, date)
+    return stats
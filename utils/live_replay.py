@@ -0,0 +1,144 @@
+# utils/live_replay.py
+import argparse
+import signal
+import sys
+import time
+from PyQt5.QtCore import QCoreApplication, QTimer
+from utils.audio_sources import FileSource, PipeSource
+from utils.file_handler import FileHandler
+from utils.keyword_matcher import create_keyword_matcher
+from utils.record_store import open_record_store
+from utils.settings import load_settings
+from utils.voice_recorder import VoiceRecorderThread
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+def unique_ids(sources):
+    # Two files with the same name would otherwise share a source id
+    seen = {}
+    for source in sources:
+        count = seen.get(source.source_id, 0) + 1
+        seen[source.source_id] = count
+        if count > 1:
+            source.source_id = f"{source.source_id}#{count}"
+    return sources
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Feed audio files or named pipes through the live recording path."
+    )
+    parser.add_argument('files', nargs='*', help="audio files, each replayed as its own source")
+    parser.add_argument('-P', '--pipe', action='append', default=[],
+                        help="named pipe with raw int16 PCM (- for stdin); may be repeated")
+    parser.add_argument('--pipe-rate', type=int, default=16000, help="sample rate of pipe input")
+    parser.add_argument('--pipe-channels', type=int, default=1, help="channels of pipe input")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="replay speed as a multiple of real time, 0 for as fast as possible")
+    parser.add_argument('--loop', action='store_true', help="restart files at their end")
+    parser.add_argument('--duration', type=float, help="stop after this many wall clock seconds")
+    parser.add_argument('--phrase-time-limit', type=float,
+                        help="cut phrases longer than this many seconds, overrides the settings")
+    parser.add_argument('--partial-interval', type=float,
+                        help="seconds between interim results of a phrase, overrides the settings")
+    parser.add_argument('-k', '--keywords', help="keywords CSV")
+    parser.add_argument('-o', '--output', help="record file (.csv or .db) for matched phrases")
+    parser.add_argument('-s', '--settings', help="settings file (default: settings.json)")
+    parser.add_argument('-b', '--backend', help="recognizer backend, overrides the settings")
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't print recognized phrases")
+    return parser, parser.parse_args(argv)
+
+def main(argv=None):
+    parser, args = parse_args(argv)
+    if not args.files and not args.pipe:
+        parser.print_usage(sys.stderr)
+        print("No audio sources given", file=sys.stderr)
+        return EXIT_USAGE
+    if args.speed < 0:
+        parser.print_usage(sys.stderr)
+        print("--speed can't be negative", file=sys.stderr)
+        return EXIT_USAGE
+
+    settings = load_settings(args.settings)
+    if args.backend:
+        settings["recognizer"]["backend"] = args.backend
+    if args.phrase_time_limit is not None:
+        settings["recorder"]["phrase_time_limit"] = args.phrase_time_limit or None
+    if args.partial_interval is not None:
+        settings["recorder"]["partial_interval"] = args.partial_interval or None
+    try:
+        sources = [FileSource(path, speed=args.speed, loop=args.loop) for path in args.files]
+    except RuntimeError as e:
+        print(f"Error opening audio file: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+    sources += [PipeSource(path, sample_rate=args.pipe_rate, channels=args.pipe_channels)
+                for path in args.pipe]
+    unique_ids(sources)
+
+    keywords = FileHandler(None, args.keywords).load_keywords() if args.keywords else []
+    matcher = create_keyword_matcher(keywords, settings)
+    store = open_record_store(args.output, settings) if args.output else None
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    thread = VoiceRecorderThread(matcher, settings=settings, sources=sources)
+    summary = {'stats': {}, 'records': 0, 'errors': 0, 'first_text': []}
+
+    def show_text(timestamp, text, source):
+        if text.startswith("Error:"):
+            summary['errors'] += 1
+            print(f"[{timestamp}] {source}: {text}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"[{timestamp}] {source}: {text}")
+
+    def show_partial(timestamp, text, source):
+        if not args.quiet:
+            print(f"[{timestamp}] {source}: {text} ...")
+
+    def collect_latency(event):
+        if event['name'] == 'text_latency_seconds' and event['labels'].get('kind') == 'first':
+            summary['first_text'].append(event['value'])
+
+    def save_record(timestamp, text, keywords, source, captured_at):
+        summary['records'] += 1
+        if store:
+            store.append({'timestamp': timestamp, 'text': text, 'keywords': keywords, 'source': source,
+                          'recorded_at': captured_at})
+
+    thread.textUpdated.connect(show_text)
+    thread.partialUpdated.connect(show_partial)
+    thread.metricsUpdated.connect(collect_latency)
+    thread.recordedUpdated.connect(save_record)
+    thread.statsUpdated.connect(lambda stats: summary['stats'].update(stats))
+    thread.finished.connect(app.quit)
+
+    # Ctrl+C stops the sources; the timer lets Python handle the signal
+    # while Qt's event loop is running
+    signal.signal(signal.SIGINT, lambda *_: thread.stop())
+    wake = QTimer()
+    wake.timeout.connect(lambda: None)
+    wake.start(200)
+    if args.duration:
+        QTimer.singleShot(int(args.duration * 1000), thread.stop)
+
+    started = time.perf_counter()
+    thread.start()
+    app.exec_()
+    thread.wait()
+    elapsed = time.perf_counter() - started
+    if store:
+        store.close()
+
+    audio_seconds = sum(source.frames_read / source.SAMPLE_RATE for source in sources)
+    stats = summary['stats']
+    print(f"{len(sources)} sources, audio {audio_seconds:.1f} s in {elapsed:.1f} s "
+          f"({audio_seconds / elapsed if elapsed else 0.0:.2f}x realtime), "
+          f"{stats.get('captured', 0)} phrases, {stats.get('dropped', 0)} dropped, "
+          f"{summary['records']} records, {summary['errors']} errors")
+    first_text = sorted(summary['first_text'])
+    if first_text:
+        print(f"time to first text: median {first_text[len(first_text) // 2] * 1000:.0f} ms, "
+              f"max {first_text[-1] * 1000:.0f} ms")
+    if stats.get('shutdown') is not None:
+        print(f"stopped in {stats['shutdown'] * 1000:.0f} ms")
+    return EXIT_FAILED if summary['errors'] else EXIT_OK
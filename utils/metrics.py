@@ -0,0 +1,252 @@
+# utils/metrics.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NAMESPACE = "stt"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Every metric family with its Prometheus type and help text
+METRICS = {
+    'stage_duration_seconds': ('histogram', "Time spent in one pipeline stage"),
+    'recognizer_latency_seconds': ('histogram', "Latency of single recognizer requests"),
+    'recognizer_errors_total': ('counter', "Recognizer requests that failed"),
+    'recognizer_retries_total': ('counter', "Recognizer requests that were retried"),
+    'text_latency_seconds': ('histogram', "Time from speech onset to the first and the final live text"),
+    'cache_requests_total': ('counter', "Transcription cache lookups"),
+    'segments_total': ('counter', "Speech segments by outcome"),
+    'phrases_total': ('counter', "Live phrases by outcome"),
+    'keyword_budget_exceeded_total': ('counter', "Live phrases whose fuzzy keyword matching ran out of time"),
+    'records_written_total': ('counter', "Record rows written to disk"),
+    'queue_depth': ('gauge', "Items waiting in a queue")
+}
+
+class MetricsRegistry:
+    # Thread-safe counters, gauges and histograms keyed by metric name and
+    # labels. Every update is also passed to the listeners as an event dict
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.values = {}  # (name, labels) -> number, or [bucket counts, sum, count]
+        self.listeners = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def component(self, name, listener=None):
+        return ComponentMetrics(self, name, listener)
+
+    def record(self, name, value, labels):
+        kind = METRICS[name][0]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if kind == 'counter':
+                self.values[key] = self.values.get(key, 0) + value
+            elif kind == 'gauge':
+                self.values[key] = value
+            else:
+                histogram = self.values.get(key)
+                if histogram is None:
+                    histogram = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+                for index, bound in enumerate(self.buckets):
+                    if value <= bound:
+                        histogram[0][index] += 1
+                        break
+                histogram[1] += value
+                histogram[2] += 1
+
+        event = {'type': kind, 'name': name, 'value': value, 'labels': labels, 'time': time.time()}
+        for listener in list(self.listeners):
+            listener(event)
+        return event
+
+    def snapshot(self):
+        # Picklable copy of every value, e.g. to merge results from worker
+        # processes
+        with self.lock:
+            return [
+                {'name': name, 'labels': dict(labels),
+                 'value': [list(value[0]), value[1], value[2]] if isinstance(value, list) else value}
+                for (name, labels), value in self.values.items()
+            ]
+
+    def merge(self, snapshot):
+        # Counters and histograms are added up, gauges take the merged value
+        with self.lock:
+            for sample in snapshot:
+                key = (sample['name'], tuple(sorted(sample['labels'].items())))
+                value = sample['value']
+                current = self.values.get(key)
+                if current is None or METRICS[sample['name']][0] == 'gauge':
+                    self.values[key] = [list(value[0]), value[1], value[2]] if isinstance(value, list) else value
+                elif isinstance(current, list):
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+                else:
+                    self.values[key] = current + value
+
+    def to_prometheus(self):
+        # Text exposition format, version 0.0.4
+        with self.lock:
+            values = sorted(self.values.items())
+        lines = []
+        last_name = None
+        for (name, labels), value in values:
+            full_name = f"{NAMESPACE}_{name}"
+            kind, help_text = METRICS[name]
+            if name != last_name:
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                last_name = name
+            if kind != 'histogram':
+                lines.append(f"{full_name}{format_labels(labels)} {format_value(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', format_value(bound)),)
+                lines.append(f"{full_name}_bucket{format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{full_name}_bucket{format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{full_name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{full_name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written to a temporary file and swapped in, so a scraper never
+        # reads a half-written file
+        temp_file = f"{path}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus())
+        os.replace(temp_file, path)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class ComponentMetrics:
+    # A registry view that labels everything with one component name and
+    # also hands its own events to an optional listener, e.g. a Qt signal
+    def __init__(self, registry, component, listener=None):
+        self.registry = registry
+        self.component = component
+        self.listener = listener
+
+    def record(self, name, value, labels):
+        event = self.registry.record(name, value, dict(labels, component=self.component))
+        if self.listener:
+            self.listener(event)
+
+    def inc(self, name, amount=1, **labels):
+        self.record(name, amount, labels)
+
+    def set(self, name, value, **labels):
+        self.record(name, value, labels)
+
+    def observe(self, name, value, **labels):
+        self.record(name, value, labels)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_duration_seconds', time.perf_counter() - started, stage=stage, **labels)
+
+
+class PrometheusExporter:
+    # Publishes a registry for Prometheus, either by rewriting a text file
+    # every interval (for the node_exporter textfile collector) or over HTTP
+    # at /metrics, or both
+    def __init__(self, registry, path=None, port=None, host="127.0.0.1", interval=15.0):
+        self.registry = registry
+        self.path = path
+        self.port = port
+        self.host = host
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.server = None
+
+    def start(self):
+        if self.path:
+            self.thread = threading.Thread(target=self.write_loop, daemon=True)
+            self.thread.start()
+        if self.port:
+            registry = self.registry
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ('/', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = registry.to_prometheus().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def write_loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            self.registry.write_prometheus(self.path)
+        except OSError as e:
+            print(f"Error writing metrics: {str(e)}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+            # Final values are always written
+            self.write()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+# Shared by every component unless one is given its own registry
+REGISTRY = MetricsRegistry()
+
+def start_exporter(settings, registry=REGISTRY):
+    # Returns None when neither a file nor a port is configured
+    config = settings["metrics"]
+    if not config["prometheus_file"] and not config["prometheus_port"]:
+        return None
+    return PrometheusExporter(
+        registry,
+        config["prometheus_file"],
+        config["prometheus_port"],
+        config["prometheus_host"],
+        config["export_interval"]
+    ).start()
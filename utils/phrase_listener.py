@@ -0,0 +1,90 @@
+# utils/phrase_listener.py
+import collections
+import math
+import time
+import numpy as np
+import speech_recognition as sr
+
+def chunk_energy(buffer):
+    # RMS of int16 samples, on the scale of audioop.rms
+    samples = np.frombuffer(buffer, dtype='<i2').astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+class PhraseListener:
+    # Splits a live source into phrases the way Recognizer.listen does, using
+    # the recognizer's energy threshold and pause settings, but one chunk at
+    # a time: a stopped source ends listening within one chunk, phrases are
+    # cut at phrase_time_limit seconds and every partial_interval seconds of
+    # an unfinished phrase the audio so far is handed out for interim
+    # results. None disables either limit
+    def __init__(self, recognizer, phrase_time_limit=None, partial_interval=None):
+        self.recognizer = recognizer
+        self.phrase_time_limit = phrase_time_limit
+        self.partial_interval = partial_interval
+
+    def audio(self, source, frames):
+        return sr.AudioData(b"".join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+
+    def listen(self, source):
+        # Yields ('partial', audio, onset) and ('phrase', audio, onset), onset
+        # being the perf_counter() time speech started. Ends when the source
+        # is stopped or runs out of audio, yielding the unfinished phrase
+        recognizer = self.recognizer
+        seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+        pause_buffer_count = math.ceil(recognizer.pause_threshold / seconds_per_buffer)
+        phrase_buffer_count = math.ceil(recognizer.phrase_threshold / seconds_per_buffer)
+        non_speaking_buffer_count = math.ceil(recognizer.non_speaking_duration / seconds_per_buffer)
+        limit_buffer_count = (math.ceil(self.phrase_time_limit / seconds_per_buffer)
+                              if self.phrase_time_limit else None)
+        partial_buffer_count = (max(1, math.ceil(self.partial_interval / seconds_per_buffer))
+                                if self.partial_interval else None)
+
+        while True:
+            # Wait for speech, keeping a little audio from before it
+            frames = collections.deque()
+            while True:
+                buffer = source.stream.read(source.CHUNK)
+                if not buffer:
+                    return
+                frames.append(buffer)
+                if len(frames) > non_speaking_buffer_count:
+                    frames.popleft()
+                energy = chunk_energy(buffer)
+                if energy > recognizer.energy_threshold:
+                    break
+                if recognizer.dynamic_energy_threshold:
+                    damping = recognizer.dynamic_energy_adjustment_damping ** seconds_per_buffer
+                    target_energy = energy * recognizer.dynamic_energy_ratio
+                    recognizer.energy_threshold = (recognizer.energy_threshold * damping
+                                                   + target_energy * (1 - damping))
+            onset = time.perf_counter()
+
+            # Read until a long enough pause, the phrase limit or the end
+            pause_count = 0
+            phrase_count = 0
+            ended = False
+            while True:
+                phrase_count += 1
+                if limit_buffer_count and phrase_count >= limit_buffer_count:
+                    break
+                buffer = source.stream.read(source.CHUNK)
+                if not buffer:
+                    ended = True
+                    break
+                frames.append(buffer)
+                if chunk_energy(buffer) > recognizer.energy_threshold:
+                    pause_count = 0
+                else:
+                    pause_count += 1
+                if pause_count > pause_buffer_count:
+                    break
+                if partial_buffer_count and phrase_count % partial_buffer_count == 0:
+                    yield 'partial', self.audio(source, frames), onset
+
+            # Trailing silence beyond what listen() keeps is dropped
+            for _ in range(min(pause_count - non_speaking_buffer_count, len(frames) - 1)):
+                frames.pop()
+            if phrase_count - pause_count >= phrase_buffer_count:
+                yield 'phrase', self.audio(source, frames), onset
+            if ended:
+                return
@@ -0,0 +1,164 @@
+# utils/recognizers.py
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import speech_recognition as sr
+
+RECOGNIZER_SAMPLE_RATE = 16000
+
+class RecognizerBackend:
+    name = None
+
+    def __init__(self, language="id-ID"):
+        self.language = language
+
+    def cache_id(self):
+        # Identifies everything besides the audio and language that affects
+        # the recognized text
+        return self.name
+
+    def recognize(self, audio):
+        # Takes sr.AudioData and returns the text. Raises
+        # sr.UnknownValueError when nothing was understood and
+        # sr.RequestError when the engine failed
+        raise NotImplementedError
+
+    def try_recognize(self, audio):
+        try:
+            return self.recognize(audio)
+        except (sr.UnknownValueError, sr.RequestError) as e:
+            return e
+
+    def recognize_batch(self, audios, max_workers=4):
+        # Returns one entry per segment in input order: the recognized
+        # text, or the sr.UnknownValueError / sr.RequestError it raised
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            return list(executor.map(self.try_recognize, audios))
+
+
+class GoogleBackend(RecognizerBackend):
+    name = "google"
+
+    def __init__(self, language="id-ID", key=None, operation_timeout=None):
+        super().__init__(language)
+        self.key = key
+        self.operation_timeout = operation_timeout
+
+    def recognize(self, audio):
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.operation_timeout
+        return recognizer.recognize_google(
+            audio,
+            key=self.key,
+            language=self.language,
+            show_all=False
+        )
+
+
+class WhisperBackend(RecognizerBackend):
+    # Offline engine built on faster-whisper. The model is loaded once and
+    # shared; it is downloaded on first use unless model points at a local
+    # directory
+    name = "whisper"
+
+    def __init__(self, language="id-ID", model="base", device="cpu", compute_type="int8",
+                 beam_size=1):
+        super().__init__(language)
+        from faster_whisper import WhisperModel
+
+        self.model_name = model
+        self.model = WhisperModel(model, device=device, compute_type=compute_type)
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.lock = threading.Lock()
+
+    def cache_id(self):
+        return f"{self.name}:{self.model_name}:{self.compute_type}:{self.beam_size}"
+
+    def recognize(self, audio):
+        raw = audio.get_raw_data(convert_rate=RECOGNIZER_SAMPLE_RATE, convert_width=2)
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+
+        try:
+            with self.lock:
+                segments, _ = self.model.transcribe(
+                    samples,
+                    language=self.language.split('-')[0],
+                    beam_size=self.beam_size
+                )
+                text = " ".join(segment.text.strip() for segment in segments).strip()
+        except Exception as e:
+            raise sr.RequestError(f"whisper failed: {str(e)}")
+
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class FakeBackend(RecognizerBackend):
+    # Deterministic stand-in for benchmarks and offline testing. The text,
+    # errors and silence detection depend only on the audio content, the
+    # seed and how many times the same audio has been tried, so runs are
+    # reproducible regardless of thread scheduling
+    name = "fake"
+
+    VOCABULARY = [
+        "halo", "repeater", "speed", "test", "satu", "dua", "tiga", "kapal",
+        "menara", "cuaca", "posisi", "arah", "ketinggian", "landasan", "siap"
+    ]
+
+    def __init__(self, language="id-ID", latency=0.0, error_rate=0.0, seed=0,
+                 words_per_second=2.5, silence_rms=50, vocabulary=None):
+        super().__init__(language)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.words_per_second = words_per_second
+        self.silence_rms = silence_rms
+        self.vocabulary = vocabulary or self.VOCABULARY
+        self.attempts = {}
+        self.lock = threading.Lock()
+
+    def cache_id(self):
+        return f"{self.name}:{self.seed}:{self.words_per_second}:{','.join(self.vocabulary)}"
+
+    def recognize(self, audio):
+        raw = audio.get_raw_data(convert_width=2)
+        digest = hashlib.sha1(str(self.seed).encode())
+        digest.update(raw)
+        digest = digest.hexdigest()
+
+        with self.lock:
+            attempt = self.attempts.get(digest, 0)
+            self.attempts[digest] = attempt + 1
+        rng = random.Random(f"{digest}:{attempt}")
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if rng.random() < self.error_rate:
+            raise sr.RequestError("fake backend error")
+
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+        if not len(samples) or np.sqrt(np.mean(samples * samples)) < self.silence_rms:
+            raise sr.UnknownValueError()
+
+        duration = len(samples) / audio.sample_rate
+        count = max(1, int(duration * self.words_per_second))
+        return " ".join(rng.choice(self.vocabulary) for _ in range(count))
+
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    WhisperBackend.name: WhisperBackend,
+    FakeBackend.name: FakeBackend
+}
+
+def create_backend(config):
+    name = config.get("backend", "google")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown recognizer backend: {name}")
+    return BACKENDS[name](language=config.get("language", "id-ID"), **config.get("options", {}))
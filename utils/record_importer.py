@@ -0,0 +1,35 @@
+# utils/record_importer.py
+from PyQt5.QtCore import QThread, pyqtSignal
+
+class RecordImportThread(QThread):
+    progress_updated = pyqtSignal(int, int)  # percent of the file read, records imported
+    result_ready = pyqtSignal(dict)          # read, imported, duplicates and cancelled
+    failed = pyqtSignal(str)
+
+    def __init__(self, record_store, path, on_records=None):
+        super().__init__()
+        self.record_store = record_store
+        self.path = path
+        # Called on this thread with every batch of newly imported records
+        self.on_records = on_records
+        self.is_running = True
+
+    def report_progress(self, bytes_read, size, imported):
+        percent = int(bytes_read * 100 / size) if size else 100
+        self.progress_updated.emit(min(percent, 100), imported)
+
+    def run(self):
+        try:
+            result = self.record_store.import_csv(
+                self.path,
+                on_progress=self.report_progress,
+                should_stop=lambda: not self.is_running,
+                on_records=self.on_records
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.result_ready.emit(result)
+
+    def stop(self):
+        self.is_running = False
@@ -0,0 +1,407 @@
+# utils/record_store.py
+import csv
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from utils.file_handler import FileHandler, RECORD_HEADER, KEYWORD_SEPARATOR, record_digest
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+RECORD_COLUMNS = "timestamp, text, keywords, recorded_at, source"
+
+def stream_import(path, insert_unique, prepare=None, on_progress=None, should_stop=None,
+                  on_records=None, batch_size=1000):
+    # Reads a record CSV row by row and hands it to insert_unique in
+    # batches; insert_unique returns the records of a batch that were new,
+    # which are also passed to on_records. on_progress gets (bytes read,
+    # file size, records imported) and should_stop is checked between
+    # batches. Records imported before a stop are kept, so importing the
+    # same file again resumes it
+    size = os.path.getsize(path)
+    result = {'read': 0, 'imported': 0, 'duplicates': 0, 'cancelled': False}
+    position = 0
+
+    def progress(bytes_read):
+        nonlocal position
+        position = bytes_read
+
+    def flush(batch):
+        imported = insert_unique(batch)
+        if on_records and imported:
+            on_records(imported)
+        result['read'] += len(batch)
+        result['imported'] += len(imported)
+        result['duplicates'] += len(batch) - len(imported)
+        if on_progress:
+            on_progress(position, size, result['imported'])
+
+    batch = []
+    for record in FileHandler(path, None).iter_recorded(progress):
+        batch.append(prepare(record) if prepare else record)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+            if should_stop and should_stop():
+                result['cancelled'] = True
+                return result
+    if batch:
+        flush(batch)
+    if on_progress:
+        on_progress(size, size, result['imported'])
+    return result
+
+def fts_query(query):
+    # Every word becomes a quoted FTS5 string, so user text such as
+    # speed-150, a lone quote or AND is searched for literally instead of
+    # being parsed as query syntax
+    return " ".join('"' + token.replace('"', '""') + '"' for token in query.split())
+
+def import_dates(path):
+    # A stream_import prepare function for records without recorded_at.
+    # CSV timestamps only carry the time of day, so such rows are dated with
+    # the file's modification date
+    date = datetime.fromtimestamp(os.path.getmtime(path)).date()
+    # There are at most 86400 distinct timestamps, so each is parsed once
+    moments = {}
+
+    def prepare(record):
+        if record.get('recorded_at'):
+            return record
+        timestamp = record['timestamp']
+        if timestamp not in moments:
+            try:
+                moment = datetime.combine(date, datetime.strptime(timestamp, "%H:%M:%S").time())
+                moments[timestamp] = moment.timestamp()
+            except ValueError:
+                moments[timestamp] = None
+        if moments[timestamp] is not None:
+            record['recorded_at'] = moments[timestamp]
+        return record
+
+    return prepare
+
+class CSVRecordStore:
+    # The original storage: the whole record CSV is kept in memory and new
+    # records are appended through the FileHandler journal
+    def __init__(self, record_file, flush_interval=1.0, fsync_interval=5.0, compact_on_close=True):
+        self.file_handler = FileHandler(record_file, None)
+        self.compact_on_close = compact_on_close
+        self.file_handler.open_journal(flush_interval, fsync_interval)
+        self.records = self.file_handler.load_recorded()
+        self.lock = threading.Lock()
+        # Built on the first import only, live recording never needs it
+        self.digests = None
+
+    def count(self):
+        return len(self.records)
+
+    def page(self, offset, limit):
+        return self.records[offset:offset + limit]
+
+    def iter_records(self):
+        return iter(list(self.records))
+
+    def append(self, record):
+        with self.lock:
+            self.records.append(record)
+            self.file_handler.append_recorded(record)
+            if self.digests is not None:
+                self.digests.add(record_digest(record))
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def insert_unique(self, records):
+        with self.lock:
+            if self.digests is None:
+                self.digests = {record_digest(record) for record in self.records}
+            imported = []
+            for record in records:
+                digest = record_digest(record)
+                if digest in self.digests:
+                    continue
+                self.digests.add(digest)
+                self.records.append(record)
+                self.file_handler.append_recorded(record)
+                imported.append(record)
+        return imported
+
+    def search(self, query=None, keyword=None, source=None, offset=0, limit=100):
+        query = query.casefold() if query else None
+        matches = [
+            record for record in self.records
+            if (query is None or query in record['text'].casefold())
+            and (keyword is None or keyword in record.get('keywords', []))
+            and (source is None or record.get('source', '') == source)
+        ]
+        return matches[offset:offset + limit]
+
+    def import_csv(self, path, on_progress=None, should_stop=None, on_records=None):
+        # Imported records are appended in file order, dated like in
+        # SQLiteRecordStore so both keep the same recorded_at
+        return stream_import(path, self.insert_unique, import_dates(path), on_progress,
+                             should_stop, on_records)
+
+    def export_csv(self, path):
+        FileHandler(path, None).save_recorded(self.records)
+
+    def close(self):
+        self.file_handler.close(self.records if self.compact_on_close else None)
+
+
+class SQLiteRecordStore:
+    # Records live in SQLite with an FTS5 index over text and keywords and a
+    # keyword table for exact filtering, so the GUI only ever loads the rows
+    # it shows. Each record also gets recorded_at (epoch seconds) for
+    # time-range queries and ordering, since the CSV timestamp has no date,
+    # and a digest of its timestamp and text for deduplicating imports
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.has_fts = True
+        self.create_schema()
+
+    def create_schema(self):
+        with self.lock, self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    keywords TEXT NOT NULL DEFAULT '',
+                    recorded_at REAL NOT NULL,
+                    digest BLOB,
+                    source TEXT NOT NULL DEFAULT ''
+                )""")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS records_recorded_at ON records(recorded_at)")
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(records)")]
+            if 'digest' not in columns:
+                self.add_digests()
+            if 'source' not in columns:
+                self.connection.execute("ALTER TABLE records ADD COLUMN source TEXT NOT NULL DEFAULT ''")
+            # Not unique: live recording may legitimately repeat a phrase
+            # within one second, only imports skip known records
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS records_digest ON records(digest)")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS record_keywords (
+                    record_id INTEGER NOT NULL REFERENCES records(id) ON DELETE CASCADE,
+                    keyword TEXT NOT NULL
+                )""")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS record_keywords_keyword ON record_keywords(keyword, record_id)")
+            try:
+                self.connection.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+                        text, keywords, content='records', content_rowid='id'
+                    )""")
+                self.connection.execute("""
+                    CREATE TRIGGER IF NOT EXISTS records_fts_insert AFTER INSERT ON records BEGIN
+                        INSERT INTO records_fts(rowid, text, keywords)
+                        VALUES (new.id, new.text, new.keywords);
+                    END""")
+                self.connection.execute("""
+                    CREATE TRIGGER IF NOT EXISTS records_fts_delete AFTER DELETE ON records BEGIN
+                        INSERT INTO records_fts(records_fts, rowid, text, keywords)
+                        VALUES ('delete', old.id, old.text, old.keywords);
+                    END""")
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5, fall back to LIKE searches
+                self.has_fts = False
+
+    def add_digests(self):
+        # Migrates stores created before imports were deduplicated
+        self.connection.execute("ALTER TABLE records ADD COLUMN digest BLOB")
+        rows = self.connection.execute("SELECT id, timestamp, text FROM records")
+        while True:
+            batch = rows.fetchmany(1000)
+            if not batch:
+                break
+            self.connection.executemany(
+                "UPDATE records SET digest = ? WHERE id = ?",
+                [(record_digest({'timestamp': timestamp, 'text': text}), record_id)
+                 for record_id, timestamp, text in batch]
+            )
+
+    def to_record(self, row):
+        return {
+            'timestamp': row[0],
+            'text': row[1],
+            'keywords': [kw for kw in row[2].split(KEYWORD_SEPARATOR) if kw],
+            'recorded_at': row[3],
+            'source': row[4]
+        }
+
+    def insert(self, cursor, record, digest=None):
+        keywords = record.get('keywords', [])
+        cursor.execute(
+            "INSERT INTO records (timestamp, text, keywords, recorded_at, digest, source) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (record['timestamp'], record['text'], KEYWORD_SEPARATOR.join(keywords),
+             record.get('recorded_at') or time.time(), digest or record_digest(record),
+             record.get('source', ''))
+        )
+        record_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO record_keywords (record_id, keyword) VALUES (?, ?)",
+            [(record_id, keyword) for keyword in keywords]
+        )
+
+    def count(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def page(self, offset, limit):
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {RECORD_COLUMNS} FROM records "
+                "ORDER BY recorded_at, id LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [self.to_record(row) for row in rows]
+
+    def iter_records(self, batch_size=1000):
+        # Streams every record in order without holding the lock between
+        # batches
+        last = (float('-inf'), 0)
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    f"SELECT {RECORD_COLUMNS}, id FROM records "
+                    "WHERE (recorded_at, id) > (?, ?) ORDER BY recorded_at, id LIMIT ?",
+                    last + (batch_size,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self.to_record(row)
+            last = (rows[-1][3], rows[-1][5])
+
+    def time_range(self, start, end, offset=0, limit=100):
+        # start and end are epoch seconds
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {RECORD_COLUMNS} FROM records "
+                "WHERE recorded_at >= ? AND recorded_at < ? ORDER BY recorded_at, id "
+                "LIMIT ? OFFSET ?", (start, end, limit, offset)
+            ).fetchall()
+        return [self.to_record(row) for row in rows]
+
+    def search(self, query=None, keyword=None, source=None, start=None, end=None, offset=0, limit=100):
+        # query matches records containing all of its words, through the FTS5
+        # index when available; keyword is an exact match on the keywords
+        # stored with the record and source on its source id
+        conditions = []
+        params = []
+        if query and self.has_fts and not fts_query(query):
+            query = None
+        if query:
+            if self.has_fts:
+                conditions.append("records.id IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?)")
+                params.append(fts_query(query))
+            else:
+                conditions.append("records.text LIKE ?")
+                params.append(f"%{query}%")
+        if keyword:
+            conditions.append("records.id IN (SELECT record_id FROM record_keywords WHERE keyword = ?)")
+            params.append(keyword)
+        if source is not None:
+            conditions.append("records.source = ?")
+            params.append(source)
+        if start is not None:
+            conditions.append("records.recorded_at >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("records.recorded_at < ?")
+            params.append(end)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {RECORD_COLUMNS} FROM records "
+                f"{where} ORDER BY records.recorded_at, records.id LIMIT ? OFFSET ?", params + [limit, offset]
+            ).fetchall()
+        return [self.to_record(row) for row in rows]
+
+    def append(self, record):
+        with self.lock, self.connection:
+            self.insert(self.connection.cursor(), record)
+
+    def extend(self, records, batch_size=1000):
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                count += self.insert_batch(batch)
+                batch = []
+        if batch:
+            count += self.insert_batch(batch)
+        return count
+
+    def insert_batch(self, records):
+        with self.lock, self.connection:
+            cursor = self.connection.cursor()
+            for record in records:
+                self.insert(cursor, record)
+        return len(records)
+
+    def insert_unique(self, records):
+        # Skips records whose digest is already stored or appeared earlier
+        # in the batch and returns the records that were inserted
+        digests = [record_digest(record) for record in records]
+        with self.lock, self.connection:
+            cursor = self.connection.cursor()
+            known = set()
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                known.update(row[0] for row in cursor.execute(
+                    f"SELECT digest FROM records WHERE digest IN ({placeholders})", chunk))
+            imported = []
+            for record, digest in zip(records, digests):
+                if digest in known:
+                    continue
+                known.add(digest)
+                self.insert(cursor, record, digest)
+                imported.append(record)
+        return imported
+
+    def import_csv(self, path, on_progress=None, should_stop=None, on_records=None):
+        # Rows keep the recorded_at of the exported file, older rows are
+        # dated with the file's modification date. Pages are ordered by that
+        # time, which merges them into the existing history
+        return stream_import(path, self.insert_unique, import_dates(path), on_progress,
+                             should_stop, on_records)
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(RECORD_HEADER)
+            with self.lock:
+                rows = self.connection.execute(
+                    "SELECT timestamp, text, keywords, source, recorded_at FROM records "
+                    "ORDER BY recorded_at, id")
+                for row in rows:
+                    writer.writerow(list(row[:4]) + [f"{row[4]:.3f}"])
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def open_record_store(record_file, settings):
+    if record_file.lower().endswith(SQLITE_EXTENSIONS):
+        return SQLiteRecordStore(record_file)
+    records_settings = settings["records"]
+    return CSVRecordStore(
+        record_file,
+        records_settings["flush_interval"],
+        records_settings["fsync_interval"],
+        records_settings["compact_on_close"]
+    )
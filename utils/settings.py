@@ -0,0 +1,75 @@
+# utils/settings.py
+import copy
+import json
+import os
+
+SETTINGS_FILE = os.environ.get("STT_SETTINGS", "settings.json")
+
+DEFAULT_SETTINGS = {
+    "recognizer": {
+        "backend": "google",      # google, whisper or fake
+        "language": "id-ID",
+        "max_workers": 4,
+        "max_retries": 3,
+        "retry_backoff": 1.0,
+        "options": {}             # Extra keyword arguments for the backend
+    },
+    "cache": {
+        "enabled": True,
+        "directory": None,        # Defaults to ~/.cache/speech_to_text
+        "max_bytes": 2147483648   # Oldest entries are evicted above this size
+    },
+    "recorder": {
+        "max_workers": 2,         # Concurrent recognitions of live phrases
+        "queue_size": 8,          # Captured phrases waiting for recognition
+        "backpressure_timeout": 0.5,  # Seconds to wait on a full queue before dropping
+        "phrase_time_limit": 10.0,  # Longer phrases are cut, null for no limit
+        "partial_interval": None,  # Seconds between interim results of a phrase, null for none
+        "shutdown_timeout": 1.0,  # Seconds a stop keeps recognizing captured phrases
+        "sources": []             # Audio sources, empty for the default microphone
+    },
+    "keywords": {
+        "whole_word": False,      # Only match keywords on word boundaries
+        "fuzzy": False,           # Also match near-hits of misrecognized keywords
+        "threshold": 0.8,         # Lowest similarity (0-1) a near-hit needs
+        "phonetic": True,         # Compare spelling-normalized forms
+        "min_length": 4,          # Shorter keywords only match exactly
+        "time_budget_ms": 5.0     # Fuzzy matching time per phrase, null for no limit
+    },
+    "records": {
+        "flush_interval": 1.0,    # Seconds between journal flushes
+        "fsync_interval": 5.0,    # Seconds between fsyncs, null to only sync on close
+        "compact_on_close": True  # Rewrite the record file from memory on close
+    },
+    "display": {
+        "page_size": 500,         # Records fetched from the store at a time
+        "log_scrollback": 5000,   # Log lines kept before the oldest are dropped
+        "batch_interval_ms": 100  # How often queued log and record updates are shown
+    },
+    "metrics": {
+        "prometheus_file": None,  # Text file for the node_exporter textfile collector
+        "prometheus_port": None,  # Serve /metrics over HTTP on this port
+        "prometheus_host": "127.0.0.1",
+        "export_interval": 15.0   # Seconds between rewrites of prometheus_file
+    }
+}
+
+def merge_settings(base, overrides):
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_settings(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def load_settings(path=None):
+    path = path or SETTINGS_FILE
+    try:
+        with open(path, 'r') as file:
+            return merge_settings(DEFAULT_SETTINGS, json.load(file))
+    except FileNotFoundError:
+        return copy.deepcopy(DEFAULT_SETTINGS)
+    except Exception as e:
+        print(f"Error loading settings: {str(e)}")
+        return copy.deepcopy(DEFAULT_SETTINGS)
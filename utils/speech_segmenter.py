@@ -0,0 +1,134 @@
+# utils/speech_segmenter.py
+import numpy as np
+from utils.metrics import REGISTRY
+
+class SpeechSegmenter:
+    def __init__(self, sample_rate, frame_ms=30, threshold_db=-40.0, min_silence_ms=500,
+                 min_speech_ms=250, padding_ms=200, max_segment_ms=30000, max_merge_gap_ms=2000,
+                 metrics=None):
+        self.sample_rate = sample_rate
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.threshold_db = threshold_db
+        self.min_silence_frames = max(1, self.ms_to_frames(min_silence_ms))
+        self.min_speech_frames = self.ms_to_frames(min_speech_ms)
+        self.max_segment_frames = max(1, self.ms_to_frames(max_segment_ms))
+        self.max_merge_gap_frames = self.ms_to_frames(max_merge_gap_ms)
+        # Padding never reaches past the silence that closes a region, so a
+        # segment can always be cut from audio that is already buffered
+        self.padding = min(int(sample_rate * padding_ms / 1000),
+                           self.min_silence_frames * self.frame_length)
+        self.metrics = metrics or REGISTRY.component("segmenter")
+
+    def cache_id(self):
+        # Identifies the settings that change where segments are cut
+        return (f"{self.sample_rate}:{self.frame_length}:{self.threshold_db}:"
+                f"{self.min_silence_frames}:{self.min_speech_frames}:{self.padding}:"
+                f"{self.max_segment_frames}:{self.max_merge_gap_frames}")
+
+    def ms_to_frames(self, milliseconds):
+        return int(round(milliseconds * self.sample_rate / 1000 / self.frame_length))
+
+    def frame_mask(self, samples):
+        # Vectorized frame energy in dBFS for every complete frame
+        count = len(samples) // self.frame_length
+        frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+        frames = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        return 20 * np.log10(rms + 1e-10) > self.threshold_db
+
+    def runs(self, mask, first_frame):
+        # Splits a boolean frame mask into (is_speech, start, end) runs
+        if not len(mask):
+            return
+        edges = np.flatnonzero(np.diff(mask.astype(np.int8))) + 1
+        starts = np.concatenate(([0], edges))
+        ends = np.concatenate((edges, [len(mask)]))
+        for start, end in zip(starts, ends):
+            yield bool(mask[start]), first_frame + int(start), first_frame + int(end)
+
+    def segments(self, blocks):
+        # Consumes int16 blocks and yields (start_sample, samples) for each
+        # speech segment as soon as the pause that ends it has been seen.
+        # Silence is dropped, short regions separated by short pauses are
+        # merged up to max_segment_ms, and returned samples are views
+        buffer = np.zeros(0, dtype=np.int16)
+        buffer_start = 0
+        next_frame = 0
+        region_start = None
+        region_end = None
+        pending = None
+        emitted_end = 0
+        closed = []
+
+        def close_region(start, end):
+            nonlocal pending
+            if end - start < self.min_speech_frames:
+                return
+            if pending is None:
+                pending = [start, end]
+            elif (end - pending[0] <= self.max_segment_frames
+                    and start - pending[1] <= self.max_merge_gap_frames):
+                pending[1] = end
+            else:
+                closed.append(tuple(pending))
+                pending = [start, end]
+
+        def cut(start_frame, end_frame, available):
+            nonlocal emitted_end
+            start = max(start_frame * self.frame_length - self.padding, emitted_end)
+            end = min(end_frame * self.frame_length + self.padding, available)
+            emitted_end = end
+            return start, buffer[start - buffer_start:end - buffer_start]
+
+        for block in blocks:
+            buffer = np.concatenate([buffer, block]) if len(buffer) else block
+            available = buffer_start + len(buffer)
+            with self.metrics.span('vad'):
+                mask = self.frame_mask(buffer[next_frame * self.frame_length - buffer_start:])
+
+            for is_speech, start, end in self.runs(mask, next_frame):
+                if is_speech:
+                    if region_start is None:
+                        region_start = start
+                    region_end = None
+                    # Regions longer than the maximum are cut hard
+                    while end - region_start > self.max_segment_frames:
+                        split = region_start + self.max_segment_frames
+                        close_region(region_start, split)
+                        region_start = split
+                else:
+                    if region_start is not None and region_end is None:
+                        region_end = start
+                    if region_start is not None and end - region_end >= self.min_silence_frames:
+                        close_region(region_start, region_end)
+                        region_start = region_end = None
+
+                # A pending segment that can't grow any further is released
+                if pending is not None and region_start is None and (
+                        end - pending[1] > self.max_merge_gap_frames
+                        or end - pending[0] >= self.max_segment_frames):
+                    closed.append(tuple(pending))
+                    pending = None
+
+            next_frame += len(mask)
+
+            for start_frame, end_frame in closed:
+                yield cut(start_frame, end_frame, available)
+            closed.clear()
+
+            # Drop audio that can no longer belong to any segment
+            keep_frame = next_frame
+            for frame in (region_start, pending[0] if pending else None):
+                if frame is not None:
+                    keep_frame = min(keep_frame, frame)
+            keep = max(keep_frame * self.frame_length - self.padding, emitted_end, buffer_start)
+            buffer = buffer[keep - buffer_start:]
+            buffer_start = keep
+
+        available = buffer_start + len(buffer)
+        if region_start is not None:
+            close_region(region_start, region_end if region_end is not None else next_frame)
+        if pending is not None:
+            closed.append(tuple(pending))
+        for start_frame, end_frame in closed:
+            yield cut(start_frame, end_frame, available)
@@ -0,0 +1,149 @@
+# utils/transcription_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "speech_to_text")
+
+class TranscriptionCache:
+    # On-disk cache for recognizer results and preprocessed audio. Entries
+    # are addressed by a hash of their input, tracked in an SQLite index and
+    # evicted least-recently-used first once max_bytes is exceeded
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "audio"), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    text TEXT,
+                    path TEXT,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            # Content hashes of source files, so unchanged files aren't rehashed
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    digest TEXT NOT NULL
+                )""")
+
+    def stats(self):
+        with self.lock:
+            size, count = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': count, 'bytes': size}
+
+    def chunk_key(self, samples, backend_id, language, sample_rate):
+        digest = hashlib.sha256(f"chunk|{backend_id}|{language}|{sample_rate}|".encode())
+        digest.update(memoryview(np.ascontiguousarray(samples)).cast('B'))
+        return digest.hexdigest()
+
+    def file_digest(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, digest FROM file_hashes WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def audio_key(self, path, preprocessing_id):
+        return hashlib.sha256(f"audio|{preprocessing_id}|{self.file_digest(path)}".encode()).hexdigest()
+
+    def lookup(self, key):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT text, path FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            return row
+
+    def store(self, key, text=None, path=None, size=0):
+        with self.lock:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO entries (key, text, path, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, text, path, size, time.time()))
+            self.evict()
+
+    def evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.connection.execute(
+            "SELECT key, path, size FROM entries ORDER BY last_access").fetchall()
+        with self.connection:
+            for key, path, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                if path and os.path.exists(path):
+                    os.remove(path)
+                total -= size
+
+    def get_text(self, key):
+        row = self.lookup(key)
+        return row[0] if row else None
+
+    def put_text(self, key, text):
+        self.store(key, text=text, size=len(text.encode('utf-8')))
+
+    def audio_blocks(self, key, produce_blocks, block_samples):
+        # Yields int16 blocks for a preprocessed source file. On a hit they
+        # are read from a memory-mapped cache file; on a miss the blocks from
+        # produce_blocks() are passed through and written to the cache, which
+        # is only committed once the whole file has been produced
+        row = self.lookup(key)
+        if row and row[1] and os.path.exists(row[1]):
+            samples = np.memmap(row[1], dtype=np.int16, mode='r')
+            for start in range(0, len(samples), block_samples):
+                yield samples[start:start + block_samples]
+            return
+
+        path = os.path.join(self.directory, "audio", f"{key}.pcm")
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        completed = False
+        try:
+            with open(temp_path, 'wb') as file:
+                for block in produce_blocks():
+                    file.write(memoryview(np.ascontiguousarray(block)).cast('B'))
+                    yield block
+            os.replace(temp_path, path)
+            completed = True
+            self.store(key, path=path, size=os.path.getsize(path))
+        finally:
+            if not completed and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
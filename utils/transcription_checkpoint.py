@@ -0,0 +1,83 @@
+# utils/transcription_checkpoint.py
+import json
+import os
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+class TranscriptionCheckpoint:
+    # Sidecar JSON Lines file with one line per finished segment. The first
+    # line holds a fingerprint of the source file and pipeline settings; a
+    # checkpoint with a different fingerprint is discarded. A lock file keeps
+    # two runs from writing the same checkpoint
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.file = None
+        self.lock_file = None
+
+    def acquire(self):
+        # Raises OSError when the directory isn't writable or another run
+        # holds the checkpoint
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock_file = open(f"{self.path}.lock", 'a')
+        if fcntl:
+            try:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.lock_file.close()
+                self.lock_file = None
+                raise
+
+    def load(self):
+        completed = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                header = json.loads(file.readline() or '{}')
+                if header.get('fingerprint') != self.fingerprint:
+                    return {}
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn last line from an interrupted write
+                        break
+                    completed[entry['index']] = (entry['start'], entry['length'], entry['text'])
+        except (FileNotFoundError, ValueError):
+            return {}
+        return completed
+
+    def open(self, completed):
+        # Rewrites the file with the entries that are still valid, then
+        # keeps it open for appending
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+            for index in sorted(completed):
+                start, length, text = completed[index]
+                file.write(json.dumps({'index': index, 'start': start, 'length': length, 'text': text}) + '\n')
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def record(self, index, start, length, text):
+        self.file.write(json.dumps({'index': index, 'start': start, 'length': length, 'text': text}) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        if self.lock_file:
+            self.lock_file.close()
+            self.lock_file = None
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        if os.path.exists(f"{self.path}.lock"):
+            os.remove(f"{self.path}.lock")
+        self.close()
@@ -0,0 +1,273 @@
+# utils/transcription_pipeline.py
+import speech_recognition as sr
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+from utils.audio_preprocessor import AudioPreprocessor, TARGET_SAMPLE_RATE
+from utils.speech_segmenter import SpeechSegmenter
+from utils.recognizers import create_backend
+from utils.transcription_cache import TranscriptionCache, DEFAULT_CACHE_DIRECTORY
+from utils.transcription_checkpoint import TranscriptionCheckpoint
+from utils.metrics import REGISTRY
+from utils.settings import load_settings
+
+SAMPLE_WIDTH = 2  # int16 PCM
+
+class TranscriptionPipeline:
+    # Preprocessing, segmentation and recognition of one audio file, free of
+    # any Qt dependency. Progress messages, finished segments and metric
+    # events are reported through the on_progress, on_chunk and on_metrics
+    # callbacks
+    def __init__(self, audio_file, chunk_length_ms=30000, max_workers=None, max_retries=None,
+                 retry_backoff=None, preprocessor=None, segmenter=None, backend=None, settings=None,
+                 cache=None, checkpoint_file=None, on_progress=None, on_chunk=None,
+                 registry=None, on_metrics=None):
+        # Anything not passed explicitly comes from the settings
+        settings = settings or load_settings()
+        config = settings["recognizer"]
+        self.audio_file = audio_file
+        self.chunk_length_ms = chunk_length_ms
+        self.max_workers = max(1, max_workers or config["max_workers"])
+        self.max_retries = config["max_retries"] if max_retries is None else max_retries
+        self.retry_backoff = config["retry_backoff"] if retry_backoff is None else retry_backoff
+        self.backend = backend or create_backend(config)
+        self.metrics = (registry or REGISTRY).component("transcriber", on_metrics)
+        self.cache = cache
+        # A cache created here is closed at the end of run(); a passed in
+        # one belongs to the caller
+        self.owns_cache = cache is None and settings["cache"]["enabled"]
+        if self.owns_cache:
+            self.cache = TranscriptionCache(
+                settings["cache"]["directory"] or DEFAULT_CACHE_DIRECTORY,
+                settings["cache"]["max_bytes"]
+            )
+        self.preprocessor = preprocessor or AudioPreprocessor(metrics=self.metrics)
+        # chunk_length_ms is the upper bound for a single speech segment
+        self.segmenter = segmenter or SpeechSegmenter(
+            TARGET_SAMPLE_RATE, max_segment_ms=chunk_length_ms, metrics=self.metrics
+        )
+        # By default checkpoints live in the cache directory rather than next
+        # to the audio file, which may be read-only or shared
+        self.checkpoint_file = checkpoint_file
+        self.on_progress = on_progress or (lambda message: None)
+        self.on_chunk = on_chunk or (lambda chunk: None)
+        self.results = {}
+        self.is_running = True
+        self.stop_event = threading.Event()
+
+    def format_timestamp(self, milliseconds):
+        seconds = int(milliseconds / 1000)
+        return str(timedelta(seconds=seconds))
+
+    def to_audio_data(self, chunk):
+        # Hand the recognizer a byte view of the PCM buffer instead of
+        # round-tripping through a WAV file
+        return sr.AudioData(memoryview(chunk).cast('B'), TARGET_SAMPLE_RATE, SAMPLE_WIDTH)
+
+    def transcribe_audio_chunk(self, chunk):
+        key = None
+        if self.cache:
+            key = self.cache.chunk_key(chunk, self.backend.cache_id(), self.backend.language, TARGET_SAMPLE_RATE)
+            text = self.cache.get_text(key)
+            self.metrics.inc('cache_requests_total', result='miss' if text is None else 'hit')
+            if text is not None:
+                return text
+
+        text = self.recognize_chunk(chunk)
+        # Failed requests are not cached so they are retried on the next run
+        if key and not self.is_failed(text):
+            self.cache.put_text(key, text)
+        return text
+
+    def recognize_chunk(self, chunk):
+        audio = self.to_audio_data(chunk)
+
+        backend = self.backend.name
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                text = self.backend.recognize(audio)
+                self.metrics.observe('recognizer_latency_seconds', time.perf_counter() - started,
+                                     backend=backend, outcome='ok')
+                return text
+            except sr.UnknownValueError:
+                self.metrics.observe('recognizer_latency_seconds', time.perf_counter() - started,
+                                     backend=backend, outcome='unknown')
+                return "[tidak dapat mengenali audio]"
+            except sr.RequestError as e:
+                self.metrics.observe('recognizer_latency_seconds', time.perf_counter() - started,
+                                     backend=backend, outcome='error')
+                self.metrics.inc('recognizer_errors_total', backend=backend)
+                if attempt >= self.max_retries or not self.is_running:
+                    return f"[Error: {str(e)}]"
+                self.metrics.inc('recognizer_retries_total', backend=backend)
+                # Waiting on the stop event lets stop() cut the backoff short
+                self.stop_event.wait(self.retry_backoff * (2 ** attempt))
+
+    def preprocessed_blocks(self):
+        if not self.cache:
+            return self.preprocessor.stream(self.audio_file)
+        key = self.cache.audio_key(self.audio_file, self.preprocessor.cache_id())
+        block_samples = int(self.preprocessor.block_seconds * TARGET_SAMPLE_RATE)
+        return self.cache.audio_blocks(
+            key, lambda: self.preprocessor.stream(self.audio_file), block_samples
+        )
+
+    def fingerprint(self):
+        # Identifies the source file and every setting that changes how it
+        # is segmented and recognized
+        stat = os.stat(self.audio_file)
+        parts = [
+            os.path.abspath(self.audio_file), str(stat.st_size), str(stat.st_mtime_ns),
+            self.preprocessor.cache_id(), self.segmenter.cache_id(),
+            self.backend.cache_id(), self.backend.language
+        ]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def format_chunk(self, index, start, length, text):
+        return {
+            'index': index,
+            'start_time': self.format_timestamp(start * 1000 / TARGET_SAMPLE_RATE),
+            'end_time': self.format_timestamp((start + length) * 1000 / TARGET_SAMPLE_RATE),
+            'text': text
+        }
+
+    def is_transcribed(self, text):
+        return bool(text and text.strip() and text != "[tidak dapat mengenali audio]")
+
+    def is_failed(self, text):
+        return text.startswith("[Error:")
+
+    def finish_chunk(self, index, start, length, text, results, checkpoint):
+        results[index] = (start, length, text)
+        if self.is_failed(text):
+            self.metrics.inc('segments_total', status='failed')
+        else:
+            self.metrics.inc('segments_total', status='transcribed' if self.is_transcribed(text) else 'unrecognized')
+        # Failed requests aren't checkpointed so a resumed run retries them
+        if checkpoint and not self.is_failed(text):
+            checkpoint.record(index, start, length, text)
+        if self.is_transcribed(text):
+            self.on_chunk(self.format_chunk(index, start, length, text))
+
+    def collect_results(self, pending, results, checkpoint):
+        # Waits in short slices so a stop request is noticed promptly
+        self.metrics.set('queue_depth', len(pending), queue='in_flight')
+        with self.metrics.span('wait_recognizer'):
+            done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+        for future in done:
+            index, start, length = pending.pop(future)
+            self.finish_chunk(index, start, length, future.result(), results, checkpoint)
+            self.on_progress(f"Bagian {index + 1} selesai ({len(results)} bagian diproses)")
+
+    def open_checkpoint(self):
+        # Returns the checkpoint and the segments it already holds, or no
+        # checkpoint when it can't be written; the file is then transcribed
+        # without one
+        fingerprint = self.fingerprint()
+        path = self.checkpoint_file
+        if path is None:
+            if self.cache:
+                path = os.path.join(self.cache.directory, "checkpoints", f"{fingerprint}.jsonl")
+            else:
+                path = f"{self.audio_file}.progress.jsonl"
+        checkpoint = TranscriptionCheckpoint(path, fingerprint)
+        try:
+            checkpoint.acquire()
+            completed = checkpoint.load()
+            checkpoint.open(completed)
+        except OSError as e:
+            checkpoint.close()
+            self.on_progress(f"Checkpoint tidak tersedia, melanjutkan tanpa checkpoint: {str(e)}")
+            return None, {}
+        return checkpoint, completed
+
+    def transcription(self):
+        # Results are collected by chunk index so the output keeps the
+        # original order regardless of which worker finished first
+        transcription = []
+        for index in sorted(self.results):
+            start, length, text = self.results[index]
+            if self.is_transcribed(text):
+                chunk = self.format_chunk(index, start, length, text)
+                del chunk['index']
+                transcription.append(chunk)
+        return transcription
+
+    def run(self):
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        started = time.perf_counter()
+        checkpoint = None
+        results = self.results = {}
+        try:
+            self.on_progress("Memulai preprocessing audio...")
+            duration = self.preprocessor.duration(self.audio_file)
+            self.on_progress(f"Durasi audio {self.format_timestamp(duration * 1000)}")
+            
+            checkpoint, completed = self.open_checkpoint()
+            if completed:
+                self.on_progress(f"Melanjutkan dari checkpoint, {len(completed)} bagian sudah selesai")
+                for index in sorted(completed):
+                    start, length, text = completed[index]
+                    results[index] = completed[index]
+                    if self.is_transcribed(text):
+                        self.on_chunk(self.format_chunk(index, start, length, text))
+            
+            blocks = self.preprocessed_blocks()
+            pending = {}
+            segment_count = 0
+            
+            # Speech segments are submitted while preprocessing is still
+            # running; silence never reaches the recognizer. The number of
+            # segments in flight is capped so memory stays bounded when the
+            # recognizer is slower than preprocessing
+            for index, (start, chunk) in enumerate(self.segmenter.segments(blocks)):
+                if not self.is_running:
+                    break
+                segment_count += 1
+                if index in completed:
+                    continue
+                
+                future = executor.submit(self.transcribe_audio_chunk, chunk)
+                pending[future] = (index, start, len(chunk))
+                
+                while len(pending) >= self.max_workers * 2 and self.is_running:
+                    self.collect_results(pending, results, checkpoint)
+            
+            blocks.close()
+            
+            if self.is_running:
+                self.on_progress(
+                    f"Preprocessing audio selesai, {segment_count} segmen ucapan terdeteksi"
+                )
+            
+            while pending and self.is_running:
+                self.collect_results(pending, results, checkpoint)
+            
+            if self.cache:
+                stats = self.cache.stats()
+                self.on_progress(f"Cache: {stats['hits']} hit, {stats['misses']} miss")
+            
+            # A finished run without failed segments no longer needs its
+            # checkpoint
+            if (checkpoint and self.is_running
+                    and not any(self.is_failed(text) for _, _, text in results.values())):
+                checkpoint.remove()
+        finally:
+            # In-flight requests are abandoned rather than waited for
+            executor.shutdown(wait=False, cancel_futures=True)
+            if checkpoint:
+                checkpoint.close()
+            if self.owns_cache:
+                self.cache.close()
+            self.metrics.set('queue_depth', 0, queue='in_flight')
+            self.metrics.observe('stage_duration_seconds', time.perf_counter() - started, stage='total')
+        
+        return self.transcription()
+
+    def stop(self):
+        self.is_running = False
+        self.stop_event.set()
\ No newline at end of file
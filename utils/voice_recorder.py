@@ -1,38 +1,291 @@
+import queue
+import threading
+import time
 import speech_recognition as sr
 from datetime import datetime
 from PyQt5.QtCore import QThread, pyqtSignal
+from utils.audio_sources import create_sources
+from utils.metrics import REGISTRY
+from utils.phrase_listener import PhraseListener
+from utils.recognizers import create_backend
+from utils.settings import load_settings
 
 class VoiceRecorderThread(QThread):
-    textUpdated = pyqtSignal(str, str)  # Changed to emit timestamp and text separately
-    recordedUpdated = pyqtSignal(str, str)
-    
-    def __init__(self, keywords):
+    textUpdated = pyqtSignal(str, str, str)  # timestamp, text, source id
+    partialUpdated = pyqtSignal(str, str, str)  # timestamp, interim text of an unfinished phrase, source id
+    recordedUpdated = pyqtSignal(str, str, list, str, float)  # timestamp, text, matched keywords, source id, captured at
+    statsUpdated = pyqtSignal(dict)  # queue depth, drop and backpressure counters, latencies
+    metricsUpdated = pyqtSignal(dict)  # timing, latency and counter events
+
+    def __init__(self, keyword_matcher, backend=None, settings=None, registry=None, sources=None):
         super().__init__()
+        settings = settings or load_settings()
+        recorder_settings = settings["recorder"]
         self.is_running = True
-        self.recognizer = sr.Recognizer()
-        self.keywords = keywords
-        
-    def run(self):
-        with sr.Microphone() as source:
-            self.recognizer.adjust_for_ambient_noise(source)
-            
-            while self.is_running:
+        # Every source is captured on its own thread; without any the
+        # configured sources (by default the microphone) are used
+        self.sources = sources or create_sources(recorder_settings["sources"])
+        self.backend = backend or create_backend(settings["recognizer"])
+        self.keyword_matcher = keyword_matcher
+        self.max_workers = max(1, recorder_settings["max_workers"])
+        self.backpressure_timeout = recorder_settings["backpressure_timeout"]
+        self.phrase_time_limit = recorder_settings["phrase_time_limit"]
+        self.partial_interval = recorder_settings["partial_interval"]
+        self.shutdown_timeout = recorder_settings["shutdown_timeout"]
+        self.stopped_at = None
+        self.metrics = (registry or REGISTRY).component("recorder", self.metricsUpdated.emit)
+
+        # Captured phrases wait here for a recognition worker
+        self.queue = queue.Queue(maxsize=recorder_settings["queue_size"])
+        self.next_sequence = 0
+        self.enqueue_lock = threading.Lock()
+
+        # Results are released strictly in capture order
+        self.results = {}
+        self.next_emit = 0
+        self.results_lock = threading.Lock()
+        # Per source: the last phrase with final text, phrases that already
+        # showed text, and phrases with an interim recognition in flight
+        self.finished_phrases = {}
+        self.first_texts = set()
+        self.pending_partials = set()
+
+        self.stats = {'queue_depth': 0, 'captured': 0, 'recognized': 0, 'dropped': 0, 'backpressure': 0,
+                      'partials': 0}
+        self.latencies = {'first_text': None, 'shutdown': None}
+        self.stats_lock = threading.Lock()
+
+    def update_stats(self, **increments):
+        with self.stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+            self.stats['queue_depth'] = self.queue.qsize()
+            stats = dict(self.stats, **self.latencies)
+        for key, value in increments.items():
+            self.metrics.inc('phrases_total', value, status=key)
+        self.metrics.set('queue_depth', stats['queue_depth'], queue='phrases')
+        self.statsUpdated.emit(stats)
+
+    def stats_snapshot(self):
+        with self.stats_lock:
+            return dict(self.stats, **self.latencies)
+
+    def update_latency(self, name, seconds):
+        with self.stats_lock:
+            self.latencies[name] = seconds
+            stats = dict(self.stats, **self.latencies)
+        self.statsUpdated.emit(stats)
+
+    def enqueue(self, audio, captured_at, source_id="", phrase=0, onset=None):
+        # Sequence numbers are shared by all sources, so the lock also makes
+        # other sources wait while one is under backpressure. phrase numbers
+        # the phrases of one source and onset is when its speech started
+        with self.enqueue_lock:
+            item = (self.next_sequence, time.perf_counter(),
+                    {'captured_at': captured_at, 'source_id': source_id, 'phrase': phrase, 'onset': onset},
+                    audio)
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                # Give the workers a short grace period before dropping the phrase
+                self.update_stats(backpressure=1)
                 try:
-                    audio = self.recognizer.listen(source)
-                    text = self.recognizer.recognize_google(audio, language="id-ID")
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    
-                    self.textUpdated.emit(timestamp, text)
-                    
-                    if any(keyword.lower() in text.lower() for keyword in self.keywords):
-                        self.recordedUpdated.emit(timestamp, text)
+                    self.queue.put(item, timeout=self.backpressure_timeout)
+                except queue.Full:
+                    self.update_stats(dropped=1)
+                    return
+            self.next_sequence += 1
+        self.update_stats(captured=1)
+
+    def enqueue_partial(self, audio, captured_at, source_id, phrase, onset):
+        # Interim recognitions are skipped rather than waited for when the
+        # queue is full or the phrase already has one in flight
+        key = (source_id, phrase)
+        with self.results_lock:
+            if key in self.pending_partials:
+                return
+            self.pending_partials.add(key)
+        item = (None, time.perf_counter(),
+                {'captured_at': captured_at, 'source_id': source_id, 'phrase': phrase, 'onset': onset},
+                audio)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self.results_lock:
+                self.pending_partials.discard(key)
+
+    def recognize_worker(self):
+        while self.is_running:
+            try:
+                sequence, enqueued_at, phrase, audio = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            try:
+                # Interim text is of no use once recording has stopped
+                if sequence is None and self.stopped_at is not None:
+                    self.release_partial(phrase, None)
+                    continue
+                started = time.perf_counter()
+                self.metrics.observe('stage_duration_seconds', started - enqueued_at, stage='queue_wait')
+                try:
+                    result = self.backend.recognize(audio)
+                    outcome = 'ok'
                 except sr.UnknownValueError:
-                    pass
-                except sr.RequestError as e:
-                    self.textUpdated.emit(
-                        datetime.now().strftime("%H:%M:%S"),
-                        f"Error: {str(e)}"
-                    )
-    
+                    result = None
+                    outcome = 'unknown'
+                except Exception as e:
+                    # Any backend failure is reported like a request error;
+                    # the phrase must still be released, or every later
+                    # phrase would wait for it forever
+                    result = e if isinstance(e, sr.RequestError) else sr.RequestError(str(e))
+                    outcome = 'error'
+                    self.metrics.inc('recognizer_errors_total', backend=self.backend.name)
+                self.metrics.observe('recognizer_latency_seconds', time.perf_counter() - started,
+                                     backend=self.backend.name, outcome=outcome,
+                                     kind='final' if sequence is not None else 'partial')
+
+                if sequence is None:
+                    self.release_partial(phrase, result)
+                    self.update_stats(partials=1)
+                else:
+                    self.release(sequence, phrase, result)
+                    self.update_stats(recognized=1)
+            finally:
+                self.queue.task_done()
+
+    def release_partial(self, phrase, result):
+        key = (phrase['source_id'], phrase['phrase'])
+        with self.results_lock:
+            self.pending_partials.discard(key)
+            # Stale once the phrase has its final text
+            if (self.stopped_at is not None or not isinstance(result, str)
+                    or self.finished_phrases.get(key[0], -1) >= key[1]):
+                return
+            self.text_shown(phrase, 'first')
+            timestamp = datetime.fromtimestamp(phrase['captured_at']).strftime("%H:%M:%S")
+            self.partialUpdated.emit(timestamp, result, phrase['source_id'])
+
+    def text_shown(self, phrase, kind):
+        # Time from speech onset to the first text of a phrase, interim or
+        # final, and to its final text
+        if phrase['onset'] is None:
+            return
+        latency = time.perf_counter() - phrase['onset']
+        key = (phrase['source_id'], phrase['phrase'])
+        if key not in self.first_texts:
+            self.first_texts.add(key)
+            self.metrics.observe('text_latency_seconds', latency, kind='first')
+            self.update_latency('first_text', latency)
+        if kind == 'final':
+            self.metrics.observe('text_latency_seconds', latency, kind='final')
+
+    def release(self, sequence, phrase, result):
+        with self.results_lock:
+            self.results[sequence] = (phrase, result)
+            while self.next_emit in self.results:
+                phrase, result = self.results.pop(self.next_emit)
+                self.next_emit += 1
+                self.finished_phrases[phrase['source_id']] = phrase['phrase']
+                # Recognitions that finish past the shutdown deadline are
+                # dropped, so a stopped recorder goes quiet in bounded time
+                if not self.past_deadline():
+                    self.emit_result(phrase, result)
+                self.first_texts.discard((phrase['source_id'], phrase['phrase']))
+
+    def emit_result(self, phrase, result):
+        if result is None:
+            return
+
+        source_id = phrase['source_id']
+        timestamp = datetime.fromtimestamp(phrase['captured_at']).strftime("%H:%M:%S")
+        if isinstance(result, sr.RequestError):
+            self.textUpdated.emit(timestamp, f"Error: {str(result)}", source_id)
+            return
+
+        self.text_shown(phrase, 'final')
+        self.textUpdated.emit(timestamp, result, source_id)
+
+        # Only the fuzzy matcher has a time budget
+        exceeded = getattr(self.keyword_matcher, 'budget_exceeded', 0)
+        with self.metrics.span('keywords'):
+            matched = self.keyword_matcher.matched_keywords(result)
+        if getattr(self.keyword_matcher, 'budget_exceeded', 0) > exceeded:
+            self.metrics.inc('keyword_budget_exceeded_total')
+        if matched:
+            self.recordedUpdated.emit(timestamp, result, matched, source_id, phrase['captured_at'])
+
+    def past_deadline(self):
+        # After a stop, phrases are recognized and emitted for at most
+        # shutdown_timeout seconds
+        return (self.stopped_at is not None and self.shutdown_timeout is not None
+                and time.perf_counter() > self.stopped_at + self.shutdown_timeout)
+
+    def capture(self, source):
+        # The capture loop only segments phrases; recognition happens on the
+        # worker threads so speech is never missed while a phrase is
+        # being recognized. Each source has its own recognizer because the
+        # energy threshold adapts to that source. The listener reads one
+        # chunk at a time, so a stop ends capture within a chunk, handing
+        # over the phrase that was being spoken
+        recognizer = sr.Recognizer()
+        listener = PhraseListener(recognizer, self.phrase_time_limit, self.partial_interval)
+        phrase = 0
+        try:
+            with source:
+                if source.calibrate:
+                    recognizer.adjust_for_ambient_noise(source)
+
+                for kind, audio, onset in listener.listen(source):
+                    duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+                    if kind == 'partial':
+                        self.enqueue_partial(audio, source.captured_at(duration), source.source_id,
+                                             phrase, onset)
+                        continue
+                    self.metrics.observe('stage_duration_seconds', time.perf_counter() - onset,
+                                         stage='capture', source=source.source_id)
+                    self.enqueue(audio, source.captured_at(duration), source.source_id, phrase, onset)
+                    phrase += 1
+        except Exception as e:
+            timestamp = datetime.now().strftime("%H:%M:%S")
+            self.textUpdated.emit(timestamp, f"Error: {str(e)}", source.source_id)
+
+    def run(self):
+        workers = [threading.Thread(target=self.recognize_worker, daemon=True)
+                   for _ in range(self.max_workers)]
+        for worker in workers:
+            worker.start()
+
+        captures = [threading.Thread(target=self.capture, args=(source,), daemon=True)
+                    for source in self.sources]
+        try:
+            for capture in captures:
+                capture.start()
+            for capture in captures:
+                capture.join()
+            # Captured phrases are still recognized when the sources ran out
+            # of audio (files, closed pipes) or were stopped, after a stop
+            # until the shutdown deadline, as long as a worker is left to
+            # recognize them
+            while (self.queue.unfinished_tasks and not self.past_deadline()
+                   and any(worker.is_alive() for worker in workers)):
+                time.sleep(0.05)
+        finally:
+            self.is_running = False
+            # Workers finish their current recognition; after a stop they
+            # are only waited for until the shutdown deadline, as daemon
+            # threads whose results are dropped
+            deadline = (self.stopped_at + self.shutdown_timeout
+                        if self.stopped_at is not None and self.shutdown_timeout is not None else None)
+            for worker in workers:
+                worker.join(None if deadline is None else max(0.0, deadline - time.perf_counter()))
+            if self.stopped_at is not None:
+                shutdown = time.perf_counter() - self.stopped_at
+                self.metrics.observe('stage_duration_seconds', shutdown, stage='shutdown')
+                self.update_latency('shutdown', shutdown)
+
     def stop(self):
-        self.is_running = False
\ No newline at end of file
+        if self.stopped_at is None:
+            self.stopped_at = time.perf_counter()
+        for source in self.sources:
+            source.stop()